@@ -43,8 +43,7 @@ const difficultyColors = {
 
 const Analytics = () => {
   const currentYear = new Date().getFullYear();
-  const dummyFirstLoginYear = 2024;
-  const [firstLoginYear] = useState(dummyFirstLoginYear);
+  const [firstLoginYear, setFirstLoginYear] = useState(currentYear);
 
   const [selectedYear, setSelectedYear] = useState(currentYear);
   const [selectedMonth, setSelectedMonth] = useState(new Date().getMonth() + 1);
@@ -63,32 +62,44 @@ const Analytics = () => {
 
   const user_id = localStorage.getItem("user_id");
 
+  // earliest year with assessments, for the year filter
+  useEffect(() => {
+    axios.post('http://127.0.0.1:5000/availability', { user_id })
+      .then((res) => {
+        if (res.data.first_year) {
+          setFirstLoginYear(res.data.first_year);
+        }
+      })
+      .catch((error) => console.error('Error fetching availability:', error));
+  }, [user_id]);
+
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const recentActivitiesRes = await axios.post('http://127.0.0.1:5000/recent_activity', { user_id });
-        setRecentActivities(recentActivitiesRes.data);
-        const totalAssessmentsRes = await axios.post('http://127.0.0.1:5000/total_assessment', { user_id });
-        setTotalAssessments(totalAssessmentsRes.data);
-
-        const userPerformanceRes = await axios.post('http://127.0.0.1:5000/performance_analysis', {
-          user_id,
-          selectedYear
-        });
-        setUserPerformance(userPerformanceRes.data);
-
-        const subjectPerformanceRes = await axios.post('http://127.0.0.1:5000/sub_analysis', {
+        // all the widgets in one round trip
+        const res = await axios.post('http://127.0.0.1:5000/dashboard', {
           user_id,
           selectedYear,
-          selectedMonth
+          selectedMonth,
+          widgets: ['recent_activity', 'total_assessment', 'performance_analysis', 'sub_analysis', 'analysis']
         });
-        setSubjectPerformanceData(subjectPerformanceRes.data);
-        const topicPerformanceRes = await axios.post('http://127.0.0.1:5000/analysis', {
-          user_id,
-          selectedYear,
-          selectedMonth
-        });
-        setTopicPerformanceData(topicPerformanceRes.data);
+        const data = res.data;
+        setRecentActivities(data.recent_activity || []);
+        if (data.total_assessment) {
+          setTotalAssessments(data.total_assessment);
+        }
+        setUserPerformance(data.performance_analysis || []);
+        setSubjectPerformanceData(data.sub_analysis || []);
+        setTopicPerformanceData(data.analysis || []);
+
+        const failed = Object.values(data.errors || {}) as { message?: string; error?: string }[];
+        if (failed.length > 0) {
+          toast({
+            title: "",
+            description: failed[0].message || failed[0].error || "Failed to fetch analytics data.",
+            variant: 'destructive',
+          });
+        }
       } catch (error) {
         console.error('Error fetching dashboard data:', error);
         toast({
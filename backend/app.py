@@ -4,9 +4,15 @@ from extensions import mail
 from models import User,db,bcrypt 
 from routes import routes
 from flask_jwt_extended import JWTManager
+from expiry import init_expiry
+from rollup import init_rollup
+from paper_render import warm_up
+from outbox import init_outbox
+from json_provider import FastJSONProvider
 
 app = Flask(__name__)
 app.config.from_object(Config)
+app.json = FastJSONProvider(app)
 
 db.init_app(app)
 bcrypt.init_app(app)
@@ -15,6 +21,10 @@ mail.init_app(app)
 jwt = JWTManager(app)
 
 app.register_blueprint(routes)
+init_expiry(app)
+init_rollup(app)
+init_outbox(app)
+warm_up()
 
 if __name__ == "__main__":
     with app.app_context():
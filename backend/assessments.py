@@ -0,0 +1,262 @@
+import hashlib,json,re
+from sqlalchemy import select
+from models import db,Question,Score,Difficulty
+from gemini_clients import gemini
+import rollup
+from availability import availability
+from instrumentation import stage
+
+
+class GenerationError(Exception):
+    pass
+
+
+def assessment_prompt(subject, topic, difficulty, num_of_quest):
+    return f"""
+            generate multiple choice question based on {subject}
+            the topic related to the {topic}
+            generate question based on the level {difficulty}
+            generate {num_of_quest} questions in given {subject}
+            ### Response Format:
+            Your response **must be** a valid JSON dictionary.
+            Do **not** include any explanations, extra text, or formatting outside of JSON.
+            Strictly follow those keys only:
+            {{{{
+                "question_text": "What is the capital of France?",
+                "topic": "Geography",
+                "choices": [
+                {{"id":"a","text": "Paris"}},
+                {{"id":"b","text": "Berlin"}},
+                {{"id":"c","text": "London"}},
+                {{"id":"d","text": "Madrid"}}
+                ],
+                "is_correct":"a"
+            }},
+            {{
+                "question_text": "Who invented Python?",
+                "topic": "Programming",
+                "choices": [
+                {{"id":"a",text": "Guido van Rossum"}},
+                {{"id":"b",text": "James Gosling"}},
+                {{"id":"c","text": "Bjarne Stroustrup"}},
+                {{"id":"d","text": "Dennis Ritchie"}}
+                ],
+                "is_correct": "a"
+            }}}}
+            """
+
+
+# asks gemini for the questions and returns the parsed list
+def generate_questions(api_key, subject, topic, difficulty, num_of_quest):
+    model_res=gemini.generate(api_key, assessment_prompt(subject, topic, difficulty, num_of_quest))
+    response_text = model_res.candidates[0].content.parts[0].text
+    clean_response = re.sub(r"```json\n|\n```", "", response_text).strip()
+
+    model_output = None
+    try:
+        with stage("json_parse"):
+            model_output = json.loads(clean_response)
+    except json.JSONDecodeError as e:
+        print("JSON Decode Error:", e)
+    if not model_output or not isinstance(model_output,list):
+        raise GenerationError("AI model did not generate any valid list of content")
+    return model_output
+
+
+# incremental parser for a JSON array that arrives in pieces: feed() returns the elements
+# (objects or arrays) completed by that piece. text before the opening bracket (the ```json
+# fence) and after the closing one is ignored
+class JSONArrayStream:
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._closed = False
+        self._element = []
+
+    def feed(self, text):
+        items = []
+        for ch in text:
+            if self._closed:
+                break
+            if self._depth == 0:
+                if ch == "[":
+                    self._depth = 1
+                continue
+            if self._depth >= 2:
+                self._element.append(ch)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "[{":
+                if self._depth == 1:
+                    self._element.append(ch)
+                self._depth += 1
+            elif ch in "]}":
+                self._depth -= 1
+                if self._depth == 1:
+                    items.append(json.loads("".join(self._element)))
+                    self._element = []
+                elif self._depth == 0:
+                    self._closed = True
+        return items
+
+
+# generate_questions with gemini streaming: yields each question as soon as its object is complete
+def stream_questions(api_key, subject, topic, difficulty, num_of_quest):
+    parser = JSONArrayStream()
+    for text in gemini.stream(api_key, assessment_prompt(subject, topic, difficulty, num_of_quest)):
+        try:
+            with stage("json_parse"):
+                questions = parser.feed(text)
+        except json.JSONDecodeError as e:
+            print("JSON Decode Error:", e)
+            raise GenerationError("AI did not return valid JSON")
+        yield from questions
+
+
+# request values the score row cannot take; raised before any gemini call
+class InvalidAssessment(ValueError):
+    pass
+
+
+# checks what the score row and the prompt need, returns the question count as an int
+def check_assessment(subject, topic, difficulty, num_of_quest):
+    for name, value in (("subject", subject), ("topic", topic)):
+        if not isinstance(value, str) or not value.strip():
+            raise InvalidAssessment(f"{name} is required")
+        if len(value) > 100:
+            raise InvalidAssessment(f"{name} must be at most 100 characters")
+    if difficulty not in Difficulty.__members__:
+        raise InvalidAssessment(f"difficulty must be one of: {', '.join(Difficulty.__members__)}")
+    try:
+        count = int(num_of_quest)
+    except (TypeError, ValueError):
+        raise InvalidAssessment("questionCount must be a number")
+    if count < 1:
+        raise InvalidAssessment("questionCount must be at least 1")
+    return count
+
+
+# streaming create_assessment: yields ("question", {"index", "text", "options"}) as each one arrives,
+# then ("done", {"score_id", "questions", "question_ids"}) once it is all committed. the request is
+# checked and the score row and its rollup written before gemini is called, so only the model output
+# can fail late; ids are sent only after the commit, so a client never holds one that was rolled back.
+# one transaction like save_assessment: a failure or a client that goes away leaves nothing behind
+def stream_assessment(api_key, user_id, subject, topic, difficulty, num_of_quest):
+    check_assessment(subject, topic, difficulty, num_of_quest)
+    questions = []
+    try:
+        score=Score(subject=subject,topic=topic,difficulty=difficulty,user_id=user_id)
+        db.session.add(score)
+        db.session.flush()
+        rollup.score_created(score)
+        for i in stream_questions(api_key, subject, topic, difficulty, num_of_quest):
+            question=Question(score_id=score.id,quest_text=i["question_text"],choices=i["choices"],is_correct=i["is_correct"])
+            db.session.add(question)
+            questions.append(question)
+            yield "question", {"index": len(questions) - 1, "text": question.quest_text, "options": _options(question.choices)}
+        if not questions:
+            raise GenerationError("AI model did not generate any valid list of content")
+        db.session.flush()
+        score_id, question_ids = score.id, [q.id for q in questions]
+        db.session.commit()
+    except BaseException:
+        db.session.rollback()
+        raise
+    availability.invalidate(user_id)
+    yield "done", {"score_id": score_id, "questions": len(question_ids), "question_ids": question_ids}
+
+
+# stores the score row and its questions, returns the new score id
+def save_assessment(user_id, subject, topic, difficulty, model_output):
+    try:
+        score=Score(subject=subject,topic=topic,difficulty=difficulty,user_id=user_id)
+        db.session.add(score)
+        db.session.flush()
+        # Get the score ID after flushing
+        score_id = score.id
+        rollup.score_created(score)
+        for i in model_output:
+            question=Question(score_id=score_id,quest_text=i["question_text"],choices=i["choices"],is_correct=i["is_correct"])
+            db.session.add(question)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    availability.invalidate(user_id)
+    return score_id
+
+
+def create_assessment(api_key, user_id, subject, topic, difficulty, num_of_quest):
+    model_output = generate_questions(api_key, subject, topic, difficulty, num_of_quest)
+    return save_assessment(user_id, subject, topic, difficulty, model_output)
+
+
+# what /start and /preview read off the assessment and its questions
+ASSESSMENT_COLUMNS = (Score.id, Score.user_id, Score.subject, Score.topic, Score.status, Score.score,
+                      Score.difficulty, Score.time)
+QUESTION_COLUMNS = (Question.id.label("question_id"), Question.quest_text, Question.choices,
+                    Question.is_correct, Question.user_choice)
+# just enough to tell whether the answers changed
+ANSWER_COLUMNS = (Question.id.label("question_id"), Question.user_choice)
+
+
+# the assessment row and, unless questions=False, its questions (the given columns of them) in the
+# same round trip (one outer join ordered by question id). returns (assessment, questions),
+# assessment None if not found
+def load_assessment(user_id, score_id, questions=True, columns=QUESTION_COLUMNS):
+    owned = (Score.id == score_id, Score.user_id == user_id)
+    if not questions:
+        return db.session.execute(select(*ASSESSMENT_COLUMNS).where(*owned)).first(), []
+    rows = db.session.execute(
+        select(*ASSESSMENT_COLUMNS, *columns)
+        .outerjoin(Question, Question.score_id == Score.id)
+        .where(*owned)
+        .order_by(Question.id)
+    ).all()
+    if not rows:
+        return None, []
+    return rows[0], [r for r in rows if r.question_id is not None]
+
+
+# hash of every (question id, user choice); changes whenever /submitting stores different
+# choices, even when the score comes out the same
+def answers_version(questions):
+    digest = hashlib.sha256()
+    for q in questions:
+        digest.update(f"{q.question_id}:{q.user_choice}\n".encode())
+    return digest.hexdigest()
+
+
+def load_questions(score_id):
+    return db.session.execute(
+        select(*QUESTION_COLUMNS).where(Question.score_id == score_id).order_by(Question.id)
+    ).all()
+
+
+# choices are stored as [{"id", "text"}], the client wants [{"id", "option"}]
+def _options(choices):
+    return [{"id": c["id"], "option": c["text"]} for c in choices]
+
+
+def start_payload(assessment, questions):
+    return {"id": assessment.id, "subject": assessment.subject, "title": assessment.topic, "questions": [
+        {"id": q.question_id, "text": q.quest_text, "options": _options(q.choices)}
+        for q in questions
+    ]}
+
+
+def preview_payload(assessment, questions):
+    return {"id": assessment.id, "subject": assessment.subject, "title": assessment.topic, "questions": [
+        {"id": q.question_id, "text": q.quest_text, "options": _options(q.choices),
+         "correct_option": q.is_correct, "user_choice": q.user_choice}
+        for q in questions
+    ]}
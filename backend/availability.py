@@ -0,0 +1,44 @@
+from models import db,ScoreRollup
+from config import Config
+from lru_cache import LRUCache
+
+
+# per-user set of (year, month) buckets that have assessments, loaded from the rollup table.
+# creating or expiring an assessment invalidates the user here, but a bucket added through
+# another worker only shows up once the ttl runs out. users with nothing yet get the short
+# empty_ttl: their first assessment is usually created moments later, quite possibly elsewhere
+class AvailabilityCache:
+
+    def __init__(self, max_users, ttl, empty_ttl):
+        self.ttl = ttl
+        self.empty_ttl = empty_ttl
+        self.buckets = LRUCache(max_users)
+
+    def get(self, user_id):
+        buckets = self.buckets.get(user_id)
+        if buckets is not None:
+            return buckets
+        buckets = frozenset(
+            (year, month) for year, month in
+            db.session.query(ScoreRollup.year, ScoreRollup.month).filter_by(user_id=user_id).distinct()
+        )
+        self.buckets.put(user_id, buckets, self.ttl if buckets else self.empty_ttl)
+        return buckets
+
+    def years(self, user_id):
+        return {year for year, _ in self.get(user_id)}
+
+    def invalidate(self, *user_ids):
+        for user_id in user_ids:
+            self.buckets.pop(user_id)
+
+    def clear(self):
+        self.buckets.clear()
+
+    def stats(self):
+        stats = self.buckets.stats()
+        return {"hits": stats["hits"], "misses": stats["misses"], "users": stats["entries"]}
+
+
+availability = AvailabilityCache(Config.AVAILABILITY_CACHE_USERS, Config.AVAILABILITY_CACHE_TTL,
+                                 Config.AVAILABILITY_CACHE_EMPTY_TTL)
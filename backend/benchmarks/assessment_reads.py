@@ -0,0 +1,99 @@
+# Queries and time to build the /start and /preview bodies: the old ORM path (score, then a lazy
+# question query, options rebuilt one by one) vs the single joined read, cold and through the handler.
+# run from backend/:  python -m benchmarks.assessment_reads --questions 100 --assessments 50
+import argparse
+import time
+from flask import jsonify
+from benchmarks.common import setup_app,QueryCounter,make_user,make_assessment
+from models import db,Question,Score
+from assessments import load_assessment,start_payload,preview_payload
+from payload_cache import payload_cache
+
+
+# the handlers as they were before the joined read
+def legacy_start(user_id, score_id):
+    score = Score.query.filter_by(user_id=user_id, id=score_id).first()
+    result = {"id": score.id, "subject": score.subject, "title": score.topic, "questions": []}
+    for q in Question.query.filter_by(score_id=score.id):
+        options = []
+        for c in q.choices:
+            options.append({"id": c["id"], "option": c["text"]})
+        result["questions"].append({"id": q.id, "text": q.quest_text, "options": options})
+    return result
+
+
+def legacy_preview(user_id, score_id):
+    score = Score.query.filter_by(user_id=user_id, id=score_id).first()
+    result = {"id": score.id, "subject": score.subject, "title": score.topic, "questions": []}
+    for q in Question.query.filter_by(score_id=score.id):
+        options = []
+        for c in q.choices:
+            options.append({"id": c["id"], "option": c["text"]})
+        result["questions"].append({"id": q.id, "text": q.quest_text, "options": options,
+                                    "correct_option": q.is_correct, "user_choice": q.user_choice})
+    return result
+
+
+def joined_start(user_id, score_id):
+    score, questions = load_assessment(user_id, score_id)
+    return start_payload(score, questions)
+
+
+def joined_preview(user_id, score_id):
+    score, questions = load_assessment(user_id, score_id)
+    return preview_payload(score, questions)
+
+
+# builds and serializes every body once, in a fresh session each time
+def run(build, user_id, score_ids):
+    with QueryCounter(db.engine) as counter:
+        started = time.perf_counter()
+        for score_id in score_ids:
+            jsonify(build(user_id, score_id)).get_data()
+            db.session.remove()
+        elapsed = time.perf_counter() - started
+    return counter.count / len(score_ids), elapsed * 1000 / len(score_ids)
+
+
+def run_handler(client, path, user_id, score_ids):
+    with QueryCounter(db.engine) as counter:
+        started = time.perf_counter()
+        for score_id in score_ids:
+            res = client.post(path, json={"user_id": user_id, "score_id": score_id})
+            assert res.status_code == 200, res.json
+        elapsed = time.perf_counter() - started
+    return counter.count / len(score_ids), elapsed * 1000 / len(score_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--assessments", type=int, default=50)
+    args = parser.parse_args()
+
+    app = setup_app()
+    client = app.test_client()
+    with app.app_context():
+        user = make_user()
+        score_ids = [make_assessment(user.id, args.questions).id for _ in range(args.assessments)]
+        db.session.commit()
+        user_id = user.id
+        db.session.remove()
+
+        for kind, legacy, joined in (("start", legacy_start, joined_start),
+                                     ("preview", legacy_preview, joined_preview)):
+            assert jsonify(legacy(user_id, score_ids[0])).get_data() == jsonify(joined(user_id, score_ids[0])).get_data()
+            db.session.remove()
+            print(f"/{kind}, {args.assessments} assessments x {args.questions} questions")
+            print(f"  {'path':<16}  {'queries':>7}  {'ms/req':>7}")
+            for name, build in (("legacy build", legacy), ("joined build", joined)):
+                queries, ms = run(build, user_id, score_ids)
+                print(f"  {name:<16}  {queries:>7.1f}  {ms:>7.2f}")
+            payload_cache.clear()
+            for name in ("handler cold", "handler cached"):
+                queries, ms = run_handler(client, f"/{kind}", user_id, score_ids)
+                print(f"  {name:<16}  {queries:>7.1f}  {ms:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# Time until the first question reaches the client: blocking /generate_assessment vs mode=stream,
+# against the stub model writing its answer over --latency seconds.
+# run from backend/:  python -m benchmarks.assessment_stream --questions 10 30 --latency 3
+import argparse
+import time
+from benchmarks.common import setup_app,stub_gemini,make_user
+from models import db
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, nargs="+", default=[10, 30])
+    parser.add_argument("--latency", type=float, default=3.0)
+    args = parser.parse_args()
+
+    stub_gemini(args.latency)
+    app = setup_app()
+    client = app.test_client()
+    with app.app_context():
+        user_id = make_user().id
+        db.session.commit()
+
+    print(f"{'questions':>9}  {'blocking s':>10}  {'stream first s':>14}  {'stream done s':>13}")
+    for n in args.questions:
+        body = {"user_id": user_id, "values": {"subject": "Robotics", "topic": "Sensors",
+                                               "difficulty": "easy", "questionCount": n}}
+        started = time.perf_counter()
+        res = client.post("/generate_assessment", json=body)
+        assert res.status_code == 200, res.data
+        blocking = time.perf_counter() - started
+
+        started = time.perf_counter()
+        res = client.post("/generate_assessment", json=dict(body, mode="stream"), buffered=False)
+        first = None
+        for frame in res.response:
+            if first is None and frame.startswith(b"event: question"):
+                first = time.perf_counter() - started
+            assert not frame.startswith(b"event: error"), frame
+        done = time.perf_counter() - started
+        res.close()
+        print(f"{n:>9}  {blocking:>10.2f}  {first:>14.2f}  {done:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
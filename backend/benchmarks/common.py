@@ -0,0 +1,212 @@
+# Shared setup for the benchmarks: the real app on a throwaway SQLite database.
+import json
+import os
+import random
+import re
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from types import SimpleNamespace
+
+# has to be set before config.py is imported
+os.environ.setdefault("DATABASE_URI", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-benchmark-secret-key")
+os.environ.setdefault("EXPIRY_SWEEP_INTERVAL", "0")
+os.environ.setdefault("MAIL_OUTBOX_INTERVAL", "0")
+os.environ.setdefault("SLOW_REQUEST_MS", "0")
+
+import google.generativeai as genai
+from sqlalchemy import event
+from app import app
+from models import db,User,Score,Question,Status,Difficulty,local_now
+from gemini_clients import gemini
+from passwords import _hash
+from config import Config
+import rollup
+
+
+def setup_app(uri=None):
+    if uri:
+        app.config["SQLALCHEMY_DATABASE_URI"] = uri
+    app.config["JWT_SECRET_KEY"] = app.config.get("JWT_SECRET_KEY") or app.config["SECRET_KEY"]
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+
+# counts statements sent to the database; an executemany is one round trip
+class QueryCounter:
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.statements = []
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._before)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._before)
+
+
+@contextmanager
+def timed(results, name):
+    started = time.perf_counter()
+    yield
+    results[name] = time.perf_counter() - started
+
+
+def make_user(name="bench"):
+    user = User(username=name, email=f"{name}@example.com")
+    user.password_hash = "x"
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def make_assessment(user_id, questions, subject="Robotics", topic="Sensors", difficulty="easy", **kwargs):
+    score = Score(user_id=user_id, subject=subject, topic=topic, difficulty=difficulty, **kwargs)
+    db.session.add(score)
+    db.session.flush()
+    choices = [{"id": c, "text": f"option {c}"} for c in "abcd"]
+    db.session.add_all([
+        Question(score_id=score.id, quest_text=f"Question {i+1}?", choices=choices, is_correct="abcd"[i % 4])
+        for i in range(questions)
+    ])
+    db.session.flush()
+    return score
+
+
+# canned gemini answers, picked by what the prompt asks for
+def canned_reply(prompt):
+    prompt = str(prompt)
+    if "Generate the code" in prompt:
+        return json.dumps({"code": "print(\"hello\")", "explanation": "prints hello"})
+    if "multiple choice" in prompt:
+        match = re.search(r"generate (\d+) questions", prompt)
+        count = int(match.group(1)) if match else 10
+        return json.dumps([{
+            "question_text": f"Question {i + 1}?",
+            "topic": "Benchmark",
+            "choices": [{"id": c, "text": f"option {c}"} for c in "abcd"],
+            "is_correct": "abcd"[i % 4],
+        } for i in range(count)])
+    match = re.search(r"generate exactly (\d+) questions", prompt)
+    count = int(match.group(1)) if match else 5
+    return json.dumps({"Questions": [{"title": "Benchmark paper"}] + [
+        {"marks": marks, "questions": [f"{i + 1}. explain part {i + 1} ({marks})?" for i in range(count)]}
+        for marks in ("2 mark", "5 mark")
+    ]})
+
+
+def _reply(text):
+    part = SimpleNamespace(text=text)
+    return SimpleNamespace(text=text, candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+# stands in for genai.GenerativeModel: canned answers after a fixed delay, no network.
+# stream=True yields the answer in chunks spread over the same delay, the way the real client does
+class StubModel:
+
+    latency = 0.0
+    chunk_size = 64
+
+    def __init__(self, model_name=None, generation_config=None, **kwargs):
+        self.model_name = model_name
+        self.generation_config = generation_config
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        text = "```json\n" + canned_reply(contents) + "\n```"
+        if stream:
+            return self._stream(text)
+        time.sleep(self.latency)
+        return _reply(text)
+
+    def _stream(self, text):
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        for chunk in chunks:
+            time.sleep(self.latency / len(chunks))
+            yield _reply(chunk)
+
+
+def stub_gemini(latency=0.0):
+    StubModel.latency = latency
+    genai.GenerativeModel = StubModel
+    Config.API_KEY = Config.API_KEY or "benchmark-key"
+    Config.API_KEY1 = Config.API_KEY1 or "benchmark-key"
+    # models built before the stub went in
+    with gemini._lock:
+        gemini._models.clear()
+
+
+BENCH_PASSWORD = "benchmark"
+
+# score rows at each scale; users get about 100 assessments each
+SCALES = {"1k": 1_000, "100k": 100_000, "1M": 1_000_000}
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# synthetic users, assessments over the last year and their questions, inserted in executemany
+# batches, then the rollup rebuilt from them (backfill=False skips that). returns (user_ids, score_ids)
+def seed(scores, questions_per_score=5, users=None, batch_size=10_000, rng=None, backfill=True):
+    rng = rng or random.Random(1)
+    users = users or max(10, scores // 100)
+    now = local_now()
+    # every seeded user logs in with BENCH_PASSWORD
+    password_hash = _hash(BENCH_PASSWORD, Config.BCRYPT_LOG_ROUNDS)
+    first_user = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+    first_score = (db.session.query(db.func.max(Score.id)).scalar() or 0) + 1
+    user_ids = list(range(first_user, first_user + users))
+    score_ids = list(range(first_score, first_score + scores))
+
+    for batch in _batches(({"id": user_id, "username": f"user{user_id}", "email": f"user{user_id}@example.com",
+                            "password_hash": password_hash} for user_id in user_ids), batch_size):
+        db.session.execute(User.__table__.insert(), batch)
+
+    choices = [{"id": c, "text": f"option {c}"} for c in "abcd"]
+    difficulties = list(Difficulty)
+
+    def score_rows():
+        for n, score_id in enumerate(score_ids):
+            created = now - timedelta(minutes=rng.randrange(365 * 24 * 60))
+            due = created + timedelta(days=3)
+            if rng.random() < 0.6:
+                status, score = Status.completed, rng.randint(0, questions_per_score)
+            else:
+                status, score = (Status.pending if due > now else Status.expired), None
+            yield {"id": score_id, "user_id": user_ids[n % users], "subject": f"Subject {n % 12}",
+                   "topic": f"Topic {n % 40}", "status": status, "difficulty": difficulties[n % len(difficulties)],
+                   "time": created, "due_date": due, "score": score}
+
+    def question_rows(batch):
+        for row in batch:
+            for i in range(questions_per_score):
+                yield {"score_id": row["id"], "quest_text": f"Question {i + 1}?", "choices": choices,
+                       "is_correct": "abcd"[i % 4], "user_choice": "abcd"[rng.randrange(4)] if row["score"] is not None else None,
+                       "time": row["time"]}
+
+    for batch in _batches(score_rows(), batch_size):
+        db.session.execute(Score.__table__.insert(), batch)
+        for questions in _batches(question_rows(batch), batch_size):
+            db.session.execute(Question.__table__.insert(), questions)
+        db.session.commit()
+    if backfill:
+        rollup.backfill()
+        db.session.commit()
+    return user_ids, score_ids
@@ -0,0 +1,250 @@
+# p50/p95 latency and queries per request for every route in routes.py, offline: a throwaway
+# SQLite database seeded at the chosen scale and gemini stubbed with canned, delayed answers.
+# run from backend/:  python -m benchmarks.endpoints --scale 1k --requests 50 [--latency 0.2]
+#   --json out.json writes the results, --compare baseline.json fails (exit 1) on regressions.
+# DATABASE_URI=sqlite:////path/bench.db keeps the seeded database between runs (--reuse).
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+# has to be set before config.py is imported; bcrypt at cost 4 so the login routes do not
+# dominate the run (benchmarks/passwords.py measures the real cost)
+_workdir = tempfile.mkdtemp(prefix="bench-")
+os.environ.setdefault("DATABASE_URI", "sqlite:///" + os.path.join(_workdir, "bench.db"))
+os.environ.setdefault("BCRYPT_LOG_ROUNDS", "4")
+os.environ.setdefault("SYLLABUS_CACHE_DIR", os.path.join(_workdir, "syllabus_cache"))
+os.environ.setdefault("PAPER_DIR", os.path.join(_workdir, "papers"))
+
+from benchmarks.common import setup_app,QueryCounter,stub_gemini,seed,SCALES,BENCH_PASSWORD
+from models import db,User,Score,Question,Status
+from otp_store import otp_store
+from jobs import assessment_jobs,DONE,FAILED
+
+# keeps signups unique when a seeded database is reused
+RUN = str(int(time.time()))
+SYLLABUS = "".join(f"Unit {i}: kinematics, sensors, actuators and control. " * 10 + "\n" for i in range(20))
+
+
+# what the requests below need: seeded users and assessments, split so mutating routes
+# never touch what the read routes use
+class Context:
+
+    def __init__(self, user_ids, score_ids):
+        self.user_ids = user_ids
+        rows = db.session.query(Score.id, Score.user_id, Score.status).filter(Score.id.in_(score_ids[:5000])).all()
+        self.open = [(r.id, r.user_id) for r in rows if r.status == Status.pending]
+        self.done = [(r.id, r.user_id) for r in rows if r.status == Status.completed]
+        self.paper_id = None
+        self.job_id = None
+
+    def user(self, i):
+        return self.user_ids[i % len(self.user_ids)]
+
+    def email(self, i):
+        return f"user{self.user(i)}@example.com"
+
+
+def _year_month():
+    now = time.localtime()
+    return now.tm_year, now.tm_mon
+
+
+# route -> (method, request builder). a builder runs outside the timed section, does any setup
+# the request needs and returns (path, client kwargs)
+def _post(body):
+    return lambda ctx, i: (None, {"json": body(ctx, i)})
+
+
+def _answers(ctx, i):
+    score_id, user_id = ctx.done[i % len(ctx.done)]
+    ids = [qid for (qid,) in db.session.query(Question.id).filter(Question.score_id == score_id)]
+    return {"user_id": user_id, "score_id": score_id, "answers": {str(qid): "a" for qid in ids}}
+
+
+def _verify_otp(ctx, i):
+    otp_store.put(ctx.email(i), "123456")
+    db.session.commit()
+    return None, {"json": {"emailForReset": ctx.email(i), "otp": "123456"}}
+
+
+def _delete(ctx, i):
+    user_ids, _ = seed(100, users=1, backfill=False)
+    return None, {"json": {"user_id": user_ids[0]}}
+
+
+def _paper(ctx, i):
+    return f"/papers/{ctx.paper_id}", {}
+
+
+def _job(suffix):
+    return lambda ctx, i: (f"/generate_assessment/jobs/{ctx.job_id}{suffix}", {})
+
+
+def _dashboard(ctx, i):
+    year, month = _year_month()
+    return {"user_id": ctx.user(i), "selectedYear": year, "selectedMonth": month}
+
+
+REQUESTS = {
+    "/Signup": ("POST", _post(lambda ctx, i: {"username": f"signup{RUN}-{i}", "email": f"signup{RUN}-{i}@example.com",
+                                             "password": BENCH_PASSWORD})),
+    "/login": ("POST", _post(lambda ctx, i: {"email": ctx.email(i), "password": BENCH_PASSWORD})),
+    "/send-otp": ("POST", _post(lambda ctx, i: {"emailForReset": ctx.email(i)})),
+    "/verify-otp": ("POST", _verify_otp),
+    "/reset-password": ("POST", _post(lambda ctx, i: {"actions": "reset_password", "emailForReset": ctx.email(i),
+                                                     "newPassword": BENCH_PASSWORD})),
+    "/Pdffile": ("POST", lambda ctx, i: (None, {"data": {"syllabus_text": SYLLABUS, "questionCount": "5"}})),
+    "/papers/<paper_id>": ("GET", _paper),
+    "/feedback": ("POST", _post(lambda ctx, i: {"user_id": ctx.user(i), "feedbackType": "bug",
+                                               "feedbackText": "benchmark feedback"})),
+    "/generate_assessment": ("POST", _post(lambda ctx, i: {"user_id": ctx.user(i), "values": {
+        "subject": "Robotics", "topic": "Sensors", "difficulty": "easy", "questionCount": 10}})),
+    "/generate_assessment/jobs/<job_id>": ("GET", _job("")),
+    "/generate_assessment/jobs/<job_id>/events": ("GET", _job("/events")),
+    "/start": ("POST", _post(lambda ctx, i: dict(zip(("score_id", "user_id"), ctx.open[i % len(ctx.open)])))),
+    "/pending": ("POST", _post(lambda ctx, i: {"user_id": ctx.user(i)})),
+    "/delete": ("POST", _delete),
+    "/submitting": ("POST", lambda ctx, i: (None, {"json": _answers(ctx, i)})),
+    "/code_generator": ("POST", _post(lambda ctx, i: {"query": "print hello", "language": "python"})),
+    "/recent_activity": ("POST", _post(lambda ctx, i: {"user_id": ctx.user(i)})),
+    "/total_assessment": ("POST", _post(lambda ctx, i: {"user_id": ctx.user(i)})),
+    "/analysis": ("POST", _post(_dashboard)),
+    "/sub_analysis": ("POST", _post(_dashboard)),
+    "/performance_analysis": ("POST", _post(_dashboard)),
+    "/availability": ("POST", _post(lambda ctx, i: {"user_id": ctx.user(i)})),
+    "/dashboard": ("POST", _post(_dashboard)),
+    "/preview": ("POST", _post(lambda ctx, i: dict(zip(("score_id", "user_id"), ctx.done[i % len(ctx.done)])))),
+    "/update_exam_status": ("POST", _post(lambda ctx, i: dict(zip(("score_id", "user_id"), ctx.done[i % len(ctx.done)]),
+                                                             status="completed"))),
+    "/profile": ("POST", _post(lambda ctx, i: {"user_id": ctx.user(i)})),
+    "/metrics": ("GET", lambda ctx, i: (None, {})),
+}
+
+
+# a rendered paper and a finished job for the routes that read them
+def prepare(client, ctx):
+    res = client.post("/Pdffile", data={"syllabus_text": SYLLABUS, "questionCount": "5"})
+    ctx.paper_id = res.headers.get("X-Paper-Id")
+    res = client.post("/generate_assessment", json={"user_id": ctx.user(0), "mode": "job", "values": {
+        "subject": "Robotics", "topic": "Sensors", "difficulty": "easy", "questionCount": 10}})
+    ctx.job_id = res.json["job_id"]
+    while assessment_jobs.store.get(ctx.job_id)["status"] not in (DONE, FAILED):
+        time.sleep(0.01)
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p * len(ordered)) - 1)]
+
+
+def run_route(client, ctx, rule, method, build, requests):
+    latencies, queries, statuses = [], [], Counter()
+    for i in range(requests):
+        path, kwargs = build(ctx, i)
+        db.session.remove()
+        with QueryCounter(db.engine) as counter:
+            started = time.perf_counter()
+            res = client.open(path or rule, method=method, **kwargs)
+            # streamed bodies are produced while they are read
+            res.get_data()
+            latencies.append(time.perf_counter() - started)
+        res.close()
+        queries.append(counter.count)
+        statuses[res.status_code] += 1
+    return {
+        "method": method,
+        "requests": requests,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "queries": sum(queries) / requests,
+        "statuses": {str(code): n for code, n in sorted(statuses.items())},
+    }
+
+
+# routes slower than the baseline by more than the tolerance (and by at least min_delta ms,
+# so sub-millisecond jitter does not count), or issuing more queries
+def regressions(results, baseline, tolerance, min_delta):
+    found = []
+    for rule, result in results.items():
+        before = baseline.get(rule)
+        if before is None:
+            continue
+        slower = result["p95_ms"] - before["p95_ms"]
+        if slower > min_delta and result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            found.append(f"{rule}: p95 {before['p95_ms']:.1f} -> {result['p95_ms']:.1f} ms")
+        if result["queries"] > before["queries"] + 0.5:
+            found.append(f"{rule}: queries/request {before['queries']:.1f} -> {result['queries']:.1f}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", choices=SCALES, default="1k")
+    parser.add_argument("--questions-per-score", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="stubbed gemini delay, seconds")
+    parser.add_argument("--routes", nargs="+", help="only these rules, e.g. /start /preview")
+    parser.add_argument("--reuse", action="store_true", help="keep an already seeded DATABASE_URI")
+    parser.add_argument("--json", help="write the results here")
+    parser.add_argument("--compare", help="baseline results from an earlier --json run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 slowdown, 0.25 = 25%%")
+    parser.add_argument("--min-delta", type=float, default=2.0, help="ignore p95 slowdowns under this many ms")
+    args = parser.parse_args()
+
+    stub_gemini(args.latency)
+    if args.reuse:
+        from app import app
+        app.config["JWT_SECRET_KEY"] = app.config.get("JWT_SECRET_KEY") or app.config["SECRET_KEY"]
+    else:
+        app = setup_app()
+    client = app.test_client()
+    # failures show up in the statuses column, not as tracebacks
+    app.logger.setLevel(logging.CRITICAL)
+
+    rules = [rule for rule in app.url_map.iter_rules() if rule.endpoint.startswith("routes.")]
+    missing = sorted({rule.rule for rule in rules} - set(REQUESTS))
+    for rule in missing:
+        print(f"no benchmark request for {rule}, add one to REQUESTS", file=sys.stderr)
+    selected = [rule for rule in REQUESTS if not args.routes or rule in args.routes]
+
+    with app.app_context():
+        started = time.perf_counter()
+        if args.reuse and db.session.query(Score.id).first():
+            user_ids = [uid for (uid,) in db.session.query(User.id).filter(User.email.like("user%@example.com"))]
+            score_ids = [sid for (sid,) in db.session.query(Score.id).filter(Score.user_id.in_(user_ids[:50]))]
+        else:
+            user_ids, score_ids = seed(SCALES[args.scale], args.questions_per_score)
+        print(f"{args.scale}: {len(user_ids)} users, seeded in {time.perf_counter() - started:.1f}s, "
+              f"{db.engine.url.render_as_string(hide_password=True)}")
+        ctx = Context(user_ids, score_ids)
+        prepare(client, ctx)
+
+        results = {}
+        print(f"{'route':<44}  {'p50 ms':>8}  {'p95 ms':>8}  {'q/req':>6}  statuses")
+        for rule in selected:
+            method, build = REQUESTS[rule]
+            result = results[rule] = run_route(client, ctx, rule, method, build, args.requests)
+            statuses = " ".join(f"{code}x{n}" for code, n in result["statuses"].items())
+            print(f"{method + ' ' + rule:<44}  {result['p50_ms']:>8.2f}  {result['p95_ms']:>8.2f}  "
+                  f"{result['queries']:>6.1f}  {statuses}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"scale": args.scale, "latency": args.latency, "routes": results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            found = regressions(results, json.load(f)["routes"], args.tolerance, args.min_delta)
+        for line in found:
+            print("regression:", line)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# Prints the query plan of every hot Score/ScoreRollup/Question query and flags full table scans,
+# and sorts in the queries that must not sort (NO_SORT). exits 1 on either.
+# Runs against DATABASE_URI (MySQL EXPLAIN or SQLite EXPLAIN QUERY PLAN), read only.
+# run from backend/:  python -m benchmarks.explain_queries [--user-id 1] [--score-id 1]
+import argparse
+from datetime import timedelta
+from sqlalchemy import select, func, or_, and_
+from config import Config
+from app import app
+from models import db,Score,ScoreRollup,Question,local_now
+from expiry import overdue_batch
+from assessments import ASSESSMENT_COLUMNS,QUESTION_COLUMNS,ANSWER_COLUMNS
+
+
+def endpoint_queries(user_id, score_id):
+    now = local_now()
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    recent = (select(Score.id, Score.subject, Score.topic, Score.status, Score.score, Score.time, Score.due_date)
+              .where(Score.user_id == user_id, Score.time >= now - timedelta(days=7)))
+    pending = (select(Score.id, Score.subject, Score.topic, Score.status, Score.time, Score.due_date, Score.score)
+               .where(Score.user_id == user_id, Score.due_date > now))
+
+    def assessment(columns):
+        return (select(*ASSESSMENT_COLUMNS, *columns)
+                .outerjoin(Question, Question.score_id == Score.id)
+                .where(Score.id == score_id, Score.user_id == user_id)
+                .order_by(Question.id))
+
+    # what pagination.keyset_page adds to a query
+    def page(stmt, cursor):
+        if cursor:
+            stmt = stmt.where(or_(Score.time < now, and_(Score.time == now, Score.id < score_id)))
+        return stmt.order_by(Score.time.desc(), Score.id.desc()).limit(Config.PAGE_SIZE_DEFAULT + 1)
+
+    return [
+        # the analytics read the per month rollup, not score
+        ("total_assessment", select(func.coalesce(func.sum(ScoreRollup.count), 0),
+                                    func.coalesce(func.sum(ScoreRollup.sum_score), 0),
+                                    func.coalesce(func.sum(ScoreRollup.scored_count), 0))
+            .where(ScoreRollup.user_id == user_id, ScoreRollup.year == now.year, ScoreRollup.month == now.month)),
+        ("analysis", select(Score.topic, Score.time, Score.score, Score.difficulty)
+            .where(Score.user_id == user_id, Score.time >= month_start, Score.time <= now)
+            .order_by(Score.topic)),
+        ("sub_analysis", select(ScoreRollup.subject, func.sum(ScoreRollup.sum_score), func.sum(ScoreRollup.scored_count))
+            .where(ScoreRollup.user_id == user_id, ScoreRollup.year == now.year, ScoreRollup.month == now.month)
+            .group_by(ScoreRollup.subject).order_by(ScoreRollup.subject)),
+        ("performance_analysis", select(ScoreRollup.month, func.sum(ScoreRollup.sum_score),
+                                        func.sum(ScoreRollup.scored_count), func.sum(ScoreRollup.count))
+            .where(ScoreRollup.user_id == user_id, ScoreRollup.year == now.year)
+            .group_by(ScoreRollup.month).order_by(ScoreRollup.month)),
+        ("availability", select(ScoreRollup.year, ScoreRollup.month)
+            .where(ScoreRollup.user_id == user_id).distinct()),
+        # unpaged lists, then a keyset page (newest first, cursor on (time, id)) of each
+        ("recent_activity", recent.order_by(Score.time.desc())),
+        ("recent_activity page", page(recent, cursor=False)),
+        ("recent_activity next page", page(recent, cursor=True)),
+        ("pending", pending),
+        ("pending page", page(pending, cursor=False)),
+        ("pending next page", page(pending, cursor=True)),
+        ("expiry sweep", overdue_batch(now, Config.EXPIRY_BATCH_SIZE)),
+        # the assessment and its questions in one join, as assessments.load_assessment reads them;
+        # a warm /preview joins only the answers
+        ("start/preview", assessment(QUESTION_COLUMNS)),
+        ("preview (cached body)", assessment(ANSWER_COLUMNS)),
+        # /submitting: every answered question belongs to the assessment, then the score
+        ("submitting ownership", select(func.count(Question.id))
+            .where(Question.score_id == score_id, Question.id.in_([1, 2, 3]))),
+        ("submitting", select(func.count(Question.id))
+            .where(Question.score_id == score_id, Question.user_choice == Question.is_correct)),
+    ]
+
+
+def explain(conn, stmt):
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    result = conn.exec_driver_sql(prefix + sql)
+    return list(result.keys()), [tuple(row) for row in result]
+
+
+def is_full_scan(dialect, columns, row):
+    if dialect == "sqlite":
+        detail = row[-1]
+        return detail.startswith("SCAN ") and "INDEX" not in detail
+    record = dict(zip(columns, row))
+    return record.get("type") == "ALL"
+
+
+# queries run over and over on large row counts, where sorting every matching row is not affordable
+NO_SORT = {"expiry sweep"}
+
+
+def is_sort(dialect, columns, row):
+    if dialect == "sqlite":
+        return "TEMP B-TREE" in row[-1]
+    return "filesort" in (dict(zip(columns, row)).get("Extra") or "")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--score-id", type=int, default=1)
+    args = parser.parse_args()
+
+    full_scans = []
+    sorts = []
+    with app.app_context():
+        with db.engine.connect() as conn:
+            if conn.dialect.name == "sqlite" and not db.inspect(conn).has_table("score"):
+                db.metadata.create_all(conn)
+            for name, stmt in endpoint_queries(args.user_id, args.score_id):
+                columns, rows = explain(conn, stmt)
+                print(f"== {name}")
+                for row in rows:
+                    flag = ""
+                    if is_full_scan(conn.dialect.name, columns, row):
+                        flag = "   <-- full scan"
+                        full_scans.append(name)
+                    if name in NO_SORT and is_sort(conn.dialect.name, columns, row):
+                        flag = "   <-- sorts every match"
+                        sorts.append(name)
+                    print("   " + " | ".join(str(v) for v in row) + flag)
+    print()
+    print("full scans: " + (", ".join(sorted(set(full_scans))) if full_scans else "none"))
+    print("sorts: " + (", ".join(sorted(set(sorts))) if sorts else "none"))
+    return 1 if full_scans or sorts else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,64 @@
+# Syllabus extraction throughput (pages/sec), inline vs process pool.
+# run from backend/:  python -m benchmarks.extraction --pages 300 --workers 1 2 4
+import argparse
+import time
+from io import BytesIO
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, PageBreak
+from config import Config
+import extraction
+
+
+def make_pdf(pages):
+    buffer = BytesIO()
+    styles = getSampleStyleSheet()
+    elements = []
+    line = "Unit {0}: kinematics, dynamics, sensors, actuators and control of robotic systems. "
+    for i in range(pages):
+        elements.append(Paragraph(f"Chapter {i+1}", styles["Heading1"]))
+        for j in range(25):
+            elements.append(Paragraph(line.format(j) * 3, styles["Normal"]))
+        elements.append(PageBreak())
+    SimpleDocTemplate(buffer, pagesize=A4).build(elements)
+    return buffer.getvalue()
+
+
+def run(data, workers, repeat):
+    extraction.pool.shutdown()
+    extraction.pool.workers = workers
+    # warm the pool so process start up is not counted
+    extraction.extract_pdf(data, workers=workers)
+    best = None
+    for _ in range(repeat):
+        result = extraction.extract_pdf(data, workers=workers)
+        best = result.elapsed if best is None else min(best, result.elapsed)
+    extraction.pool.shutdown()
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = make_pdf(args.pages)
+    actual = len(extraction.PdfReader(BytesIO(data)).pages)
+    Config.EXTRACTION_MAX_PAGES = actual
+    print(f"{actual} pages, {len(data) / 1024:.0f} KiB")
+
+    started = time.perf_counter()
+    extraction._read_pages(extraction.PdfReader(BytesIO(data)), 0, actual)
+    inline = time.perf_counter() - started
+    print(f"{'inline':>10}  {inline:8.2f}s  {actual / inline:8.1f} pages/sec")
+
+    for workers in args.workers:
+        result, elapsed = run(data, workers, args.repeat)
+        note = "" if result.complete else "  (partial: " + "; ".join(result.warnings) + ")"
+        print(f"{workers:>3} workers  {elapsed:8.2f}s  {result.extracted / elapsed:8.1f} pages/sec{note}")
+
+
+if __name__ == "__main__":
+    main()
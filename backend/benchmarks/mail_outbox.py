@@ -0,0 +1,101 @@
+# Mail delivery against a local SMTP stand-in (aiosmtpd): one connection per mail.send() on the
+# request thread vs the outbox (enqueue + commit on the request, batches over one connection later),
+# then a relay outage to show the retry/backoff path.
+# run from backend/:  python -m benchmarks.mail_outbox --mails 500 --batch 50
+# needs: pip install aiosmtpd
+import argparse
+import socket
+import time
+from aiosmtpd.controller import Controller
+from flask_mail import Message
+from benchmarks.common import setup_app
+from config import Config
+from extensions import mail
+from models import db,MailOutbox
+import outbox
+
+
+class CountingHandler:
+
+    def __init__(self):
+        self.received = 0
+        self.connections = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mails", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=50)
+    args = parser.parse_args()
+
+    handler = CountingHandler()
+    port = free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+
+    app = setup_app()
+    app.config.update(MAIL_SERVER="127.0.0.1", MAIL_PORT=port, MAIL_USE_TLS=False, MAIL_USE_SSL=False,
+                      MAIL_USERNAME=None, MAIL_PASSWORD=None, MAIL_DEFAULT_SENDER="bench@example.com")
+    mail.init_app(app)
+
+    with app.app_context():
+        started = time.perf_counter()
+        for i in range(args.mails):
+            mail.send(Message(f"OTP {i}", recipients=[f"user{i}@example.com"], body="Your OTP is 123456"))
+        direct = time.perf_counter() - started
+        print(f"{'mail.send':>18}  {direct:7.3f}s  {direct / args.mails * 1000:7.2f} ms/request  "
+              f"{handler.connections} connections  {handler.received} received")
+
+        handler.connections = handler.received = 0
+        started = time.perf_counter()
+        for i in range(args.mails):
+            outbox.enqueue(f"OTP {i}", [f"user{i}@example.com"], "Your OTP is 123456")
+            db.session.commit()
+        queued = time.perf_counter() - started
+        print(f"{'outbox enqueue':>18}  {queued:7.3f}s  {queued / args.mails * 1000:7.2f} ms/request")
+
+        sender = outbox.MailSender(args.batch)
+        started = time.perf_counter()
+        sender.drain()
+        sender.close()
+        drained = time.perf_counter() - started
+        print(f"{'outbox sender':>18}  {drained:7.3f}s  {args.mails / drained:7.0f} mails/sec  "
+              f"{handler.connections} connections  {handler.received} received")
+        print(outbox.outbox_stats.snapshot())
+
+        # relay down: the batch backs off instead of failing requests
+        controller.stop()
+        Config.MAIL_RETRY_BASE = 0
+        outbox.enqueue("during outage", ["late@example.com"], "queued while the relay was down")
+        db.session.commit()
+        sender.drain()
+        sender.close()
+        row = db.session.execute(db.select(MailOutbox).filter_by(subject="during outage")).scalar_one()
+        print(f"outage: status={row.status.value} attempts={row.attempts} error={row.last_error!r}")
+
+        controller = Controller(handler, hostname="127.0.0.1", port=port)
+        controller.start()
+        sender.drain()
+        sender.close()
+        db.session.refresh(row)
+        print(f"recovered: status={row.status.value} attempts={row.attempts}  queue {outbox.queue_depth()}")
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
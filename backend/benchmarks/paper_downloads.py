@@ -0,0 +1,116 @@
+# Peak RSS while many clients download one large question paper at the same time:
+# whole paper buffered per request (old /Pdffile) vs streamed in chunks from the spooled/disk copy.
+# run from backend/:  python -m benchmarks.paper_downloads --clients 50 --sections 150 --questions 100
+import argparse
+import http.client
+import logging
+import os
+import tempfile
+import threading
+import time
+from io import BytesIO
+
+# small threshold so the benchmark paper takes the spool/disk path; set before config.py is imported
+os.environ.setdefault("PAPER_SPOOL_THRESHOLD", str(256 * 1024))
+os.environ.setdefault("PAPER_DIR", tempfile.mkdtemp(prefix="papers-"))
+
+from flask import send_file
+from werkzeug.serving import make_server
+from benchmarks.common import setup_app
+from benchmarks.paper_render import make_output
+from paper import Paper
+from paper_render import render_paper,paper_cache
+
+
+def rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+class PeakSampler:
+
+    def __init__(self):
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, rss())
+            time.sleep(0.002)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def download(port, path, chunk, delay, sizes):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("GET", path)
+    response = conn.getresponse()
+    total = 0
+    while True:
+        data = response.read(chunk)
+        if not data:
+            break
+        total += len(data)
+        # slow reader, so the downloads overlap like real clients
+        time.sleep(delay)
+    sizes.append(total)
+    conn.close()
+
+
+def run(port, path, clients, chunk, delay):
+    sizes = []
+    threads = [threading.Thread(target=download, args=(port, path, chunk, delay, sizes)) for _ in range(clients)]
+    baseline = rss()
+    started = time.perf_counter()
+    with PeakSampler() as sampler:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return time.perf_counter() - started, sampler.peak - baseline, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--sections", type=int, default=150)
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--chunk", type=int, default=16 * 1024)
+    parser.add_argument("--delay", type=float, default=0.01)
+    args = parser.parse_args()
+
+    app = setup_app()
+
+    def buffered(paper_id):
+        # the old path: every request holds its own full copy of the document
+        pdf, _ = paper_cache.open(paper_id)
+        with pdf:
+            return send_file(BytesIO(pdf.read()), mimetype="application/pdf")
+
+    app.add_url_rule("/bench/buffered/<paper_id>", "bench_buffered", buffered)
+
+    paper_id, pdf, size = render_paper(Paper.from_model_output(make_output(0, args.sections, args.questions)))
+    pdf.close()
+    print(f"paper {size / 1024:.0f} KiB, {args.clients} concurrent clients")
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        for label, path in (("buffered", f"/bench/buffered/{paper_id}"), ("streamed", f"/papers/{paper_id}")):
+            elapsed, peak, sizes = run(server.port, path, args.clients, args.chunk, args.delay)
+            ok = sum(1 for s in sizes if s == size)
+            print(f"{label:>10}  {elapsed:7.2f}s  peak rss +{peak / 1024 / 1024:7.1f} MiB  {ok}/{args.clients} complete")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
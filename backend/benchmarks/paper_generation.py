@@ -0,0 +1,77 @@
+# End-to-end latency of question-paper generation, one prompt with the whole syllabus vs
+# chunked map-reduce, against a fake model whose latency grows with prompt and answer size.
+# run from backend/:  python -m benchmarks.paper_generation --pages 20 80 200 --workers 4
+import argparse
+import json
+import re
+import time
+from types import SimpleNamespace
+from config import Config
+from gemini_clients import gemini
+import paper_generation
+
+
+LINE = "Unit {0}: kinematics, dynamics, sensors, actuators and control of robotic systems. "
+
+
+def make_syllabus(pages):
+    return "".join(f"Page {i+1}:\n" + LINE.format(i) * 20 + "\n\n" for i in range(pages))
+
+
+class FakeModel:
+
+    def __init__(self, base, per_char, per_question):
+        self.base = base
+        self.per_char = per_char
+        self.per_question = per_question
+        self.calls = 0
+
+    def __call__(self, api_key, contents, *args, **kwargs):
+        self.calls += 1
+        count = int(re.search(r"generate exactly (\d+) questions", contents).group(1))
+        units = sorted(set(re.findall(r"Unit (\d+)", contents)), key=int) or ["0"]
+        sections = [{"title": "Robotics"}]
+        for marks in ("2 mark", "5 mark"):
+            sections.append({
+                "marks": marks,
+                "questions": [f"{n + 1}. explain unit {units[n % len(units)]} ({marks}, q{n})?" for n in range(count)],
+            })
+        # prompt read time plus answer generation time
+        time.sleep(self.base + len(contents) * self.per_char + 2 * count * self.per_question)
+        part = SimpleNamespace(text="```json\n" + json.dumps({"Questions": sections}) + "\n```")
+        return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[20, 80, 200])
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-chars", type=int, default=Config.PAPER_CHUNK_CHARS)
+    parser.add_argument("--base", type=float, default=0.3)
+    parser.add_argument("--per-char", type=float, default=0.00002)
+    parser.add_argument("--per-question", type=float, default=0.05)
+    args = parser.parse_args()
+
+    fake = FakeModel(args.base, args.per_char, args.per_question)
+    gemini.generate = fake
+
+    for pages in args.pages:
+        syllabus = make_syllabus(pages)
+
+        started = time.perf_counter()
+        paper_generation.generate_paper("bench", syllabus, args.questions)
+        single = time.perf_counter() - started
+
+        fake.calls = 0
+        started = time.perf_counter()
+        output, warnings = paper_generation.generate_paper_chunked(
+            "bench", syllabus, args.questions, args.chunk_chars, args.workers)
+        chunked = time.perf_counter() - started
+        counts = [len(section["questions"]) for section in output["Questions"][1:]]
+        print(f"{pages:>4} pages {len(syllabus) / 1000:7.0f}k chars  single {single:6.2f}s  "
+              f"chunked {chunked:6.2f}s ({fake.calls} calls)  questions per section {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Question-paper rendering throughput (papers/sec): styles rebuilt per paper (old /Pdffile),
+# shared styles, repeated papers served from the render cache, and zipped variant packs in the pool.
+# run from backend/:  python -m benchmarks.paper_render --papers 200 --sections 4 --questions 10
+import argparse
+import time
+from io import BytesIO
+from reportlab.lib.enums import TA_LEFT, TA_RIGHT
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import TableStyle
+from reportlab.lib import colors
+import paper_render
+from paper import Paper,shuffled_variants
+
+
+def make_output(n, sections, questions):
+    items = [{"title": f"Robotics paper {n}"}]
+    for s in range(sections):
+        items.append({
+            "marks": f"{2 + s} mark",
+            "questions": [f"{q + 1}. explain topic {q} of unit {s} in paper {n}?" for q in range(questions)],
+        })
+    return {"Questions": items}
+
+
+def rebuilt_styles(paper):
+    # what every /Pdffile request used to do before building
+    styles = getSampleStyleSheet()
+    ParagraphStyle(name="LeftAlign", parent=styles["Heading2"], alignment=TA_LEFT)
+    ParagraphStyle(name="RightAlign", parent=styles["Heading2"], alignment=TA_RIGHT)
+    TableStyle([('TEXTCOLOR', (0, 0), (-1, -1), colors.black)])
+    paper_render.build_pdf(paper, BytesIO())
+
+
+def shared_styles(paper):
+    paper_render.build_pdf(paper, BytesIO())
+
+
+def render(output):
+    _, pdf, _ = paper_render.render_paper(Paper.from_model_output(output))
+    pdf.close()
+
+
+def timed(label, fn, items):
+    started = time.perf_counter()
+    for item in items:
+        fn(item)
+    elapsed = time.perf_counter() - started
+    print(f"{label:>16}  {elapsed:8.3f}s  {len(items) / elapsed:10.1f} papers/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--papers", type=int, default=200)
+    parser.add_argument("--sections", type=int, default=4)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--variants", type=int, default=30)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    outputs = [make_output(n, args.sections, args.questions) for n in range(args.papers)]
+    papers = [Paper.from_model_output(output) for output in outputs]
+
+    started = time.perf_counter()
+    paper_render.warm_up()
+    print(f"warm up {time.perf_counter() - started:.3f}s")
+
+    timed("rebuilt styles", rebuilt_styles, papers)
+    timed("shared styles", shared_styles, papers)
+    timed("cache cold", render, outputs)
+    timed("cache warm", render, outputs)
+    print(paper_render.paper_cache.stats())
+
+    # one class pack: k shuffled variants of a single paper, zipped
+    variants = shuffled_variants(papers[0], args.variants, seed=1)
+    for fmt in ("pdf", "docx"):
+        for workers in args.workers:
+            paper_render.pool.shutdown()
+            paper_render.pool.workers = workers
+            # warm the pool so process start up is not counted
+            paper_render.render_variants_zip(variants[:workers], fmt)[0].close()
+            started = time.perf_counter()
+            archive, size = paper_render.render_variants_zip(variants, fmt)
+            archive.close()
+            elapsed = time.perf_counter() - started
+            print(f"{fmt:>4} x{len(variants)} {workers} workers  {elapsed:8.3f}s  {len(variants) / elapsed:10.1f} papers/sec  {size / 1024:.0f} KiB zip")
+    paper_render.pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Logins/sec (bcrypt checks) under concurrent load at different cost factors and pool sizes,
+# and how many requests the queue limit turns away with a fast 503.
+# run from backend/:  python -m benchmarks.passwords --rounds 8 10 12 --workers 0 1 2 4 --clients 32
+import argparse
+import threading
+import time
+from passwords import PasswordHasher,HasherBusy,_hash
+
+
+def storm(hasher, pw_hash, clients, per_client):
+    ok = rejected = 0
+    lock = threading.Lock()
+
+    def client():
+        nonlocal ok, rejected
+        for _ in range(per_client):
+            try:
+                hasher.check("exam-day-password", pw_hash)
+                result = "ok"
+            except HasherBusy:
+                result = "rejected"
+            with lock:
+                if result == "ok":
+                    ok += 1
+                else:
+                    rejected += 1
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, ok, rejected
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, nargs="+", default=[8, 10, 12])
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--per-client", type=int, default=4)
+    parser.add_argument("--max-queue", type=int, default=32)
+    args = parser.parse_args()
+
+    for rounds in args.rounds:
+        pw_hash = _hash("exam-day-password", rounds)
+        for workers in args.workers:
+            hasher = PasswordHasher(rounds, workers, args.max_queue, timeout=600)
+            if workers:
+                # warm the pool so process start up is not counted
+                hasher.check("exam-day-password", pw_hash)
+            elapsed, ok, rejected = storm(hasher, pw_hash, args.clients, args.per_client)
+            hasher.shutdown()
+            label = f"{workers} procs" if workers else "inline"
+            print(f"cost {rounds:>2}  {label:>8}  {elapsed:7.2f}s  {ok / elapsed:8.1f} logins/sec  {rejected:4d} rejected")
+
+
+if __name__ == "__main__":
+    main()
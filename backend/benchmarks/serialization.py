@@ -0,0 +1,96 @@
+# Serialization time and bytes on the wire per endpoint: flask's stdlib json provider vs the
+# orjson provider vs msgpack, on the payloads the handlers really build.
+# run from backend/:  python -m benchmarks.serialization --questions 100 --assessments 300
+import argparse
+import random
+import time
+from datetime import timedelta
+from flask.json.provider import DefaultJSONProvider
+from benchmarks.common import setup_app,make_user,make_assessment
+from models import db,Status,local_now
+from assessments import load_assessment,preview_payload,start_payload
+import json_provider
+import rollup
+import routes
+
+
+def best_of(fn, repeat, number):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = (time.perf_counter() - started) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--assessments", type=int, default=300)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+    if json_provider.orjson is None or json_provider.msgpack is None:
+        print("orjson and msgpack are both needed for the comparison")
+        return
+
+    app = setup_app()
+    client = app.test_client()
+    now = local_now()
+    rng = random.Random(1)
+    with app.app_context():
+        user = make_user()
+        for i in range(args.assessments):
+            make_assessment(user.id, 5, subject=f"Subject {i % 7}", topic=f"Topic {i % 23}",
+                            time=now - timedelta(hours=i), score=rng.randint(0, 5),
+                            status=Status.completed)
+        big = make_assessment(user.id, args.questions)
+        db.session.commit()
+        rollup.backfill()
+        user_id, big_id = user.id, big.id
+        db.session.remove()
+
+        # the objects the handlers hand to negotiate()
+        captured = {}
+        negotiate = routes.negotiate
+
+        def capture(obj):
+            captured[path] = obj
+            return negotiate(obj)
+
+        routes.negotiate = capture
+        try:
+            for path, body in (
+                ("/pending", {"user_id": user_id, "limit": 200}),
+                ("/recent_activity", {"user_id": user_id, "limit": 200}),
+                ("/analysis", {"user_id": user_id, "selectedYear": now.year, "selectedMonth": now.month}),
+                ("/dashboard", {"user_id": user_id, "selectedYear": now.year, "selectedMonth": now.month}),
+            ):
+                res = client.post(path, json=body)
+                assert res.status_code == 200, res.json
+        finally:
+            routes.negotiate = negotiate
+        score, questions = load_assessment(user_id, big_id)
+        captured["/start"] = start_payload(score, questions)
+        captured["/preview"] = preview_payload(score, questions)
+
+        stdlib = DefaultJSONProvider(app)
+        fast = json_provider.FastJSONProvider(app)
+        encoders = (
+            ("stdlib json", lambda obj: stdlib.response(obj).get_data()),
+            ("orjson", lambda obj: fast.response(obj).get_data()),
+            ("msgpack", json_provider.packb),
+        )
+        print(f"{'endpoint':<18}" + "".join(f"  {name + ' us':>14}  {'bytes':>7}" for name, _ in encoders))
+        for path, obj in captured.items():
+            row = f"{path:<18}"
+            for name, encode in encoders:
+                size = len(encode(obj))
+                us = best_of(lambda: encode(obj), 5, args.number) * 1e6
+                row += f"  {us:>14.1f}  {size:>7}"
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# Queries and time per /submitting call, per-question loop vs the set-based path.
+# run from backend/:  python -m benchmarks.submit_queries --questions 10 30 100
+import argparse
+import time
+from benchmarks.common import setup_app,QueryCounter,make_user,make_assessment
+from models import db,Question,Score
+
+
+# the handler as it was before the bulk update: one get() per answer, then a python count
+def legacy_submit(user_id, score_id, answers):
+    for qid_str, choice in answers.items():
+        rec = Question.query.get(int(qid_str))
+        rec.user_choice = choice
+    count = 0
+    for q in Question.query.filter_by(score_id=score_id).all():
+        if q.user_choice == q.is_correct:
+            count += 1
+    score = Score.query.filter_by(user_id=user_id, id=score_id).first()
+    if score:
+        score.score = count
+    db.session.commit()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, nargs="+", default=[10, 30, 100])
+    args = parser.parse_args()
+
+    app = setup_app()
+    client = app.test_client()
+    print(f"{'questions':>9}  {'legacy q':>8}  {'legacy ms':>9}  {'bulk q':>6}  {'bulk ms':>7}")
+    with app.app_context():
+        user = make_user()
+        for n in args.questions:
+            legacy = make_assessment(user.id, n)
+            bulk = make_assessment(user.id, n)
+            db.session.commit()
+            legacy_answers = {str(q.id): "a" for q in Question.query.filter_by(score_id=legacy.id)}
+            bulk_answers = {str(q.id): "a" for q in Question.query.filter_by(score_id=bulk.id)}
+            legacy_id, bulk_id, user_id = legacy.id, bulk.id, user.id
+            db.session.remove()
+
+            with QueryCounter(db.engine) as before:
+                started = time.perf_counter()
+                legacy_submit(user_id, legacy_id, legacy_answers)
+                legacy_ms = (time.perf_counter() - started) * 1000
+            db.session.remove()
+
+            with QueryCounter(db.engine) as after:
+                started = time.perf_counter()
+                res = client.post("/submitting", json={"user_id": user_id, "score_id": bulk_id, "answers": bulk_answers})
+                bulk_ms = (time.perf_counter() - started) * 1000
+            assert res.status_code == 200, res.json
+            print(f"{n:>9}  {before.count:>8}  {legacy_ms:>9.1f}  {after.count:>6}  {bulk_ms:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,4 +18,98 @@ class Config:
 
     API_KEY1= os.getenv("API_KEY1")
 
- 
+    # extracted syllabus text cache (sizes in characters / bytes)
+    SYLLABUS_CACHE_DIR = os.getenv("SYLLABUS_CACHE_DIR", os.path.join(os.path.dirname(__file__), "instance", "syllabus_cache"))
+    SYLLABUS_CACHE_MEMORY_LIMIT = int(os.getenv("SYLLABUS_CACHE_MEMORY_LIMIT", 64 * 1024 * 1024))
+    SYLLABUS_CACHE_DISK_LIMIT = int(os.getenv("SYLLABUS_CACHE_DISK_LIMIT", 1024 * 1024 * 1024))
+
+    # syllabus extraction: process pool size (0 = extract on the request thread),
+    # per-document time budget in seconds, how long past it to wait for the page a worker is on,
+    # and page / paragraph caps
+    EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", os.cpu_count() or 2))
+    EXTRACTION_TIME_BUDGET = float(os.getenv("EXTRACTION_TIME_BUDGET", 20))
+    EXTRACTION_PAGE_GRACE = float(os.getenv("EXTRACTION_PAGE_GRACE", 1))
+    EXTRACTION_MAX_PAGES = int(os.getenv("EXTRACTION_MAX_PAGES", 500))
+    EXTRACTION_MAX_PARAGRAPHS = int(os.getenv("EXTRACTION_MAX_PARAGRAPHS", 20000))
+    EXTRACTION_INLINE_PAGES = int(os.getenv("EXTRACTION_INLINE_PAGES", 8))
+    EXTRACTION_MIN_CHUNK_PAGES = int(os.getenv("EXTRACTION_MIN_CHUNK_PAGES", 4))
+
+    # background assessment generation jobs
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+    JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(os.path.dirname(__file__), "instance", "jobs.sqlite3"))
+    # seconds a finished job stays pollable
+    JOB_RETENTION = int(os.getenv("JOB_RETENTION", 24 * 3600))
+    JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 0.5))
+
+    # gemini calls allowed in flight per api key (0 = no limit) and seconds to wait for a free slot
+    GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", 8))
+    GEMINI_ACQUIRE_TIMEOUT = float(os.getenv("GEMINI_ACQUIRE_TIMEOUT", 30))
+
+    # overdue assessment sweeper: seconds between runs (0 = only via the cli command) and rows per batch.
+    # each worker starts its sweeper thread on its first request (expiry.start_expiry)
+    EXPIRY_SWEEP_INTERVAL = float(os.getenv("EXPIRY_SWEEP_INTERVAL", 300))
+    EXPIRY_BATCH_SIZE = int(os.getenv("EXPIRY_BATCH_SIZE", 500))
+
+    # per-user (year, month) availability index used by the analytics filters; users without
+    # assessments are cached for the much shorter empty ttl
+    AVAILABILITY_CACHE_USERS = int(os.getenv("AVAILABILITY_CACHE_USERS", 10000))
+    AVAILABILITY_CACHE_TTL = float(os.getenv("AVAILABILITY_CACHE_TTL", 300))
+    AVAILABILITY_CACHE_EMPTY_TTL = float(os.getenv("AVAILABILITY_CACHE_EMPTY_TTL", 5))
+
+    # bytes of rendered question-paper pdfs kept in memory for re-downloads
+    PAPER_CACHE_LIMIT = int(os.getenv("PAPER_CACHE_LIMIT", 64 * 1024 * 1024))
+    # papers bigger than this are spooled to a temp file and cached on disk instead of in memory
+    PAPER_SPOOL_THRESHOLD = int(os.getenv("PAPER_SPOOL_THRESHOLD", 1024 * 1024))
+    PAPER_DIR = os.getenv("PAPER_DIR", os.path.join(os.path.dirname(__file__), "instance", "papers"))
+    PAPER_DISK_LIMIT = int(os.getenv("PAPER_DISK_LIMIT", 1024 * 1024 * 1024))
+    # bytes per chunk when streaming a paper to the client
+    PAPER_CHUNK_SIZE = int(os.getenv("PAPER_CHUNK_SIZE", 64 * 1024))
+    # processes rendering the variants of a multi-variant paper export, and the most variants per request
+    PAPER_EXPORT_WORKERS = int(os.getenv("PAPER_EXPORT_WORKERS", 4))
+    PAPER_MAX_VARIANTS = int(os.getenv("PAPER_MAX_VARIANTS", 60))
+
+    # chunked (map-reduce) question-paper generation: characters per syllabus chunk,
+    # syllabus length that switches to it automatically (0 = only with mode=chunked), gemini calls in parallel
+    PAPER_CHUNK_CHARS = int(os.getenv("PAPER_CHUNK_CHARS", 12000))
+    PAPER_CHUNK_AUTO = int(os.getenv("PAPER_CHUNK_AUTO", 60000))
+    PAPER_CHUNK_WORKERS = int(os.getenv("PAPER_CHUNK_WORKERS", 4))
+
+    # password reset otps: where they live (memory, sql or redis), seconds they stay valid, wrong guesses allowed
+    OTP_STORE = os.getenv("OTP_STORE", "sql")
+    OTP_TTL = int(os.getenv("OTP_TTL", 600))
+    OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", 5))
+    REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+    # mail outbox sender: seconds between polls when idle (0 = only via the cli command), mails per batch,
+    # sends tried before a mail is marked failed, retry backoff (base doubles per attempt, capped) and
+    # seconds a claimed batch stays reserved for its sender. each worker starts its sender thread on its
+    # first request (outbox.start_outbox); with the interval at 0 run flask --app app send-mail from cron
+    MAIL_OUTBOX_INTERVAL = float(os.getenv("MAIL_OUTBOX_INTERVAL", 2))
+    MAIL_OUTBOX_BATCH = int(os.getenv("MAIL_OUTBOX_BATCH", 50))
+    MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", 6))
+    MAIL_RETRY_BASE = float(os.getenv("MAIL_RETRY_BASE", 30))
+    MAIL_RETRY_MAX = float(os.getenv("MAIL_RETRY_MAX", 3600))
+    MAIL_CLAIM_LEASE = int(os.getenv("MAIL_CLAIM_LEASE", 300))
+
+    # bcrypt: cost factor (hashes with another cost are rehashed on login), hashing processes
+    # (0 = on the request thread), hashes allowed to wait for a process before logins get a 503,
+    # seconds to wait for a hash, and the Retry-After sent with the 503
+    BCRYPT_LOG_ROUNDS = int(os.getenv("BCRYPT_LOG_ROUNDS", 12))
+    BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", 2))
+    BCRYPT_MAX_QUEUE = int(os.getenv("BCRYPT_MAX_QUEUE", 32))
+    BCRYPT_TIMEOUT = float(os.getenv("BCRYPT_TIMEOUT", 10))
+    BCRYPT_RETRY_AFTER = int(os.getenv("BCRYPT_RETRY_AFTER", 1))
+
+    # user records (id, username, email) cached for the handlers that only read them
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+    USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 300))
+
+    # serialized /start and /preview bodies kept per assessment
+    PAYLOAD_CACHE_SIZE = int(os.getenv("PAYLOAD_CACHE_SIZE", 2000))
+
+    # list endpoints (/pending, /recent_activity): rows per page by default and at most
+    PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", 50))
+    PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", 200))
+
+    # requests slower than this (ms) are logged with their stage breakdown, 0 turns the log off
+    SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", 2000))
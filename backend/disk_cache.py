@@ -0,0 +1,109 @@
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+# files under a directory, one per name (kept in subdirectories by the first two characters),
+# least recently used removed once their total size passes the limit.
+# the directory is scanned once, then the sizes are tracked on every write and eviction; a
+# rescan every rescan_interval seconds picks up what other workers wrote or removed
+class DiskCache:
+
+    def __init__(self, directory, limit, rescan_interval=600):
+        self.directory = directory
+        self.limit = limit
+        self.rescan_interval = rescan_interval
+        # path -> size, least recently used first
+        self._index = None
+        self._size = 0
+        self._scanned = 0.0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def path(self, name):
+        return os.path.join(self.directory, name[:2], name)
+
+    # binary file object or None; counts as a use for eviction
+    def open(self, name):
+        path = self.path(name)
+        try:
+            f = open(path, "rb")
+        except OSError:
+            with self._lock:
+                if self._index is not None and path in self._index:
+                    self._size -= self._index.pop(path)
+            return None
+        # the mtime keeps the order across restarts and rescans
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            if self._index is not None:
+                if path not in self._index:
+                    size = os.fstat(f.fileno()).st_size
+                    self._index[path] = size
+                    self._size += size
+                self._index.move_to_end(path)
+        return f
+
+    # write(out) fills the entry through a binary file object. it goes to a temp file first so
+    # readers never see a half written entry; the temp file is removed if anything fails.
+    # raises OSError when the entry could not be stored
+    def write(self, name, write):
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                write(out)
+                size = out.tell()
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self._load()
+            self._size -= self._index.pop(path, 0)
+            self._index[path] = size
+            self._size += size
+            victims = []
+            while self._size > self.limit and len(self._index) > 1:
+                victim, victim_size = self._index.popitem(last=False)
+                self._size -= victim_size
+                victims.append(victim)
+            self.evictions += len(victims)
+        for victim in victims:
+            try:
+                os.remove(victim)
+            except OSError:
+                pass
+
+    # caller holds the lock
+    def _load(self):
+        if self._index is not None and time.monotonic() - self._scanned < self.rescan_interval:
+            return
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, path, st.st_size))
+        entries.sort()
+        self._index = OrderedDict((path, size) for _, path, size in entries)
+        self._size = sum(self._index.values())
+        self._scanned = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {"disk_entries": len(self._index or ()), "disk_size": self._size, "disk_evictions": self.evictions}
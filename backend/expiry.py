@@ -0,0 +1,148 @@
+import threading
+import time
+import click
+from sqlalchemy import select, update, delete
+from models import db,Score,Question,Status,local_now
+from config import Config
+from availability import availability
+from payload_cache import payload_cache
+
+
+# numbers from the sweeper runs in this process
+class SweepStats:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.failures = 0
+        self.total_expired = 0
+        self.last_expired = 0
+        self.last_duration = 0.0
+        self.last_run = None
+
+    def record(self, expired, duration):
+        with self._lock:
+            self.runs += 1
+            self.total_expired += expired
+            self.last_expired = expired
+            self.last_duration = duration
+            self.last_run = time.time()
+
+    def failed(self):
+        with self._lock:
+            self.failures += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "failures": self.failures,
+                "total_expired": self.total_expired,
+                "last_expired": self.last_expired,
+                "last_duration": self.last_duration,
+                "last_run": self.last_run,
+            }
+
+
+sweep_stats = SweepStats()
+
+
+# the next batch of overdue pending assessments. unordered on purpose: an ORDER BY the
+# (status, due_date) index cannot serve makes every batch sort the whole overdue backlog, and
+# the UPDATE below only expires rows that are still pending anyway
+def overdue_batch(now, batch_size):
+    return (select(Score.id, Score.user_id)
+            .where(Score.status == Status.pending, Score.due_date < now)
+            .limit(batch_size))
+
+
+# expires every overdue pending assessment of every user, batch by batch:
+# one DELETE for the questions and one UPDATE for the scores per batch.
+# pending -> expired leaves every ScoreRollup counter as it was, so the rollup needs no update here
+def sweep_expired(batch_size=None, now=None):
+    batch_size = batch_size or Config.EXPIRY_BATCH_SIZE
+    # due dates are stored as naive local (Asia/Kolkata) times
+    now = now or local_now()
+    started = time.perf_counter()
+    expired = 0
+    while True:
+        rows = db.session.execute(overdue_batch(now, batch_size)).all()
+        if not rows:
+            break
+        ids = [row.id for row in rows]
+        try:
+            db.session.execute(
+                delete(Question).where(Question.score_id.in_(ids)),
+                execution_options={"synchronize_session": False},
+            )
+            db.session.execute(
+                update(Score)
+                .where(Score.id.in_(ids), Score.status == Status.pending)
+                .values(status=Status.expired),
+                execution_options={"synchronize_session": False},
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        availability.invalidate(*{row.user_id for row in rows})
+        payload_cache.invalidate(*ids)
+        expired += len(ids)
+        if len(ids) < batch_size:
+            break
+    duration = time.perf_counter() - started
+    sweep_stats.record(expired, duration)
+    return expired, duration
+
+
+def _sweep_loop(app, interval):
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                expired, duration = sweep_expired()
+                if expired:
+                    app.logger.info("Expired %d assessments in %.3fs", expired, duration)
+            except Exception:
+                sweep_stats.failed()
+                app.logger.exception("Expiry sweep failed")
+            finally:
+                db.session.remove()
+
+
+def start_sweeper(app, interval):
+    thread = threading.Thread(target=_sweep_loop, args=(app, interval), name="expiry-sweeper", daemon=True)
+    thread.start()
+    return thread
+
+
+_sweeper = None
+_sweeper_lock = threading.Lock()
+
+
+# the in-process sweeper, one per worker process, started on the first request the process
+# serves the same way as the outbox sender (see outbox.start_outbox). with EXPIRY_SWEEP_INTERVAL=0
+# nothing expires in-process; run flask --app app expire-assessments from cron
+def start_expiry(app):
+    global _sweeper
+    if app.config["EXPIRY_SWEEP_INTERVAL"] <= 0:
+        return None
+    if _sweeper is not None and _sweeper.is_alive():
+        return _sweeper
+    with _sweeper_lock:
+        if _sweeper is None or not _sweeper.is_alive():
+            _sweeper = start_sweeper(app, app.config["EXPIRY_SWEEP_INTERVAL"])
+        return _sweeper
+
+
+def init_expiry(app):
+    # for cron: flask --app app expire-assessments
+    @app.cli.command("expire-assessments")
+    @click.option("--batch-size", type=int, default=None)
+    def expire_assessments(batch_size):
+        expired, duration = sweep_expired(batch_size)
+        click.echo(f"Expired {expired} assessments in {duration:.3f}s")
+
+    @app.before_request
+    def _start_expiry():
+        start_expiry(app)
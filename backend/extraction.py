@@ -0,0 +1,173 @@
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import wait, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from io import BytesIO
+from pypdf import PdfReader
+from docx import Document
+from config import Config
+from process_pool import ProcessPool
+
+
+class EmptyDocument(Exception):
+    pass
+
+
+@dataclass
+class ExtractionResult:
+    text: str
+    # pages for pdf, paragraphs for docx
+    total: int
+    extracted: int
+    elapsed: float
+    warnings: list = field(default_factory=list)
+
+    @property
+    def complete(self):
+        return not self.warnings
+
+
+pool = ProcessPool(Config.EXTRACTION_WORKERS)
+
+# per worker process: the pdfs it has parsed, by temp file path. every chunk of a request
+# names the same file, so a worker parses it once however many of its chunks it runs
+_documents = OrderedDict()
+_DOCUMENTS_KEPT = 2
+
+
+def _open_pdf(path):
+    reader = _documents.get(path)
+    if reader is None:
+        reader = _documents[path] = PdfReader(path)
+        while len(_documents) > _DOCUMENTS_KEPT:
+            _documents.popitem(last=False)
+    else:
+        _documents.move_to_end(path)
+    return reader
+
+
+# pages [start, stop) of the pdf, stopping at the deadline (a time.time() value, so it means
+# the same in every process). returns (text, first page not read)
+def _read_pages(reader, start, stop, deadline=None):
+    parts = []
+    for i in range(start, stop):
+        if deadline is not None and time.time() >= deadline:
+            return "".join(parts), i
+        page_text = reader.pages[i].extract_text()
+        if page_text:
+            parts.append(f"Page {i+1}:\n{page_text}\n\n")
+    return "".join(parts), stop
+
+
+# runs inside the pool: only the path and the page range cross the process boundary
+def _pdf_pages(path, start, stop, deadline):
+    if time.time() >= deadline:
+        return "", start
+    return _read_pages(_open_pdf(path), start, stop, deadline)
+
+
+# runs inside the pool: a docx has to be parsed as a whole, so it is a single task
+def _docx_text(data, limit):
+    readerdocx = Document(BytesIO(data))
+    paragraphs = readerdocx.paragraphs
+    parts = [para.text + "\n" for para in paragraphs[:limit] if para.text]
+    return "".join(parts), len(paragraphs)
+
+
+def _chunks(pages, workers):
+    # a few chunks per worker so a slow page range does not hold back the rest
+    size = max(Config.EXTRACTION_MIN_CHUNK_PAGES, -(-pages // (workers * 4)))
+    return [(start, min(start + size, pages)) for start in range(0, pages, size)]
+
+
+def extract_pdf(data, time_budget=None, max_pages=None, workers=None):
+    time_budget = Config.EXTRACTION_TIME_BUDGET if time_budget is None else time_budget
+    max_pages = Config.EXTRACTION_MAX_PAGES if max_pages is None else max_pages
+    workers = Config.EXTRACTION_WORKERS if workers is None else workers
+    started = time.perf_counter()
+
+    reader = PdfReader(BytesIO(data))
+    total = len(reader.pages)
+    if total == 0:
+        raise EmptyDocument()
+    pages = min(total, max_pages)
+    warnings = []
+    if pages < total:
+        warnings.append(f"Only the first {pages} of {total} pages were read")
+    # the readers check it between pages, so the work stops at the budget (give or take the page
+    # being read) instead of running on after the request has given up on it
+    deadline = time.time() + time_budget
+
+    def skipped(start, stop):
+        return f"Pages {start+1}-{stop} skipped: time budget of {time_budget}s exceeded"
+
+    # small documents are not worth the round trip to the pool
+    if workers <= 0 or pages <= Config.EXTRACTION_INLINE_PAGES:
+        text, read = _read_pages(reader, 0, pages, deadline)
+        if read < pages:
+            warnings.append(skipped(read, pages))
+        return ExtractionResult(text, total, read, time.perf_counter() - started, warnings)
+
+    fd, path = tempfile.mkstemp(prefix="syllabus-", suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        chunks = _chunks(pages, workers)
+        futures = [pool.submit(_pdf_pages, path, start, stop, deadline) for start, stop in chunks]
+        _, running = wait(futures, timeout=time_budget)
+        # queued chunks are dropped; running ones return what they have after their current page
+        for future in running:
+            future.cancel()
+        wait(running, timeout=Config.EXTRACTION_PAGE_GRACE)
+    finally:
+        # the workers that got to the file have parsed it already
+        os.unlink(path)
+
+    parts = []
+    extracted = 0
+    for (start, stop), future in zip(chunks, futures):
+        if not future.done() or future.cancelled():
+            warnings.append(skipped(start, stop))
+            continue
+        try:
+            text, read = future.result()
+        except Exception as e:
+            warnings.append(f"Pages {start+1}-{stop} could not be read: {e}")
+            continue
+        parts.append(text)
+        extracted += read - start
+        if read < stop:
+            warnings.append(skipped(read, stop))
+    return ExtractionResult("".join(parts), total, extracted, time.perf_counter() - started, warnings)
+
+
+def extract_docx(data, time_budget=None, max_paragraphs=None, workers=None):
+    time_budget = Config.EXTRACTION_TIME_BUDGET if time_budget is None else time_budget
+    max_paragraphs = Config.EXTRACTION_MAX_PARAGRAPHS if max_paragraphs is None else max_paragraphs
+    workers = Config.EXTRACTION_WORKERS if workers is None else workers
+    started = time.perf_counter()
+
+    if workers <= 0:
+        text, total = _docx_text(data, max_paragraphs)
+    else:
+        future = pool.submit(_docx_text, data, max_paragraphs)
+        try:
+            text, total = future.result(timeout=time_budget)
+        except FutureTimeout:
+            future.cancel()
+            return ExtractionResult("", 0, 0, time.perf_counter() - started,
+                                    [f"Document skipped: time budget of {time_budget}s exceeded"])
+    if total == 0:
+        raise EmptyDocument()
+    warnings = []
+    if total > max_paragraphs:
+        warnings.append(f"Only the first {max_paragraphs} of {total} paragraphs were read")
+    return ExtractionResult(text, total, min(total, max_paragraphs), time.perf_counter() - started, warnings)
+
+
+def extract_syllabus(data, filename):
+    if filename.lower().endswith(".pdf"):
+        return extract_pdf(data)
+    return extract_docx(data)
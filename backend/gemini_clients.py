@@ -0,0 +1,114 @@
+import json
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+import google.generativeai as genai
+from google.generativeai.client import _ClientManager
+from config import Config
+from instrumentation import stage,gemini_seconds
+
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+
+class GeminiBusy(Exception):
+    pass
+
+
+# one generative client per api key and one model per (key, model, generation_config),
+# built once and shared by every request thread instead of calling the global
+# genai.configure() on each request
+class GeminiRegistry:
+
+    def __init__(self, max_concurrency, acquire_timeout):
+        self.max_concurrency = max_concurrency
+        self.acquire_timeout = acquire_timeout
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._models = {}
+        self._slots = {}
+        self.rejected = 0
+
+    def _client(self, api_key):
+        # caller holds the lock
+        client = self._clients.get(api_key)
+        if client is None:
+            manager = _ClientManager()
+            manager.configure(api_key=api_key)
+            client = manager.get_default_client("generative")
+            self._clients[api_key] = client
+        return client
+
+    def model(self, api_key, model_name=DEFAULT_MODEL, generation_config=None):
+        key = (api_key, model_name, json.dumps(generation_config, sort_keys=True))
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                model = genai.GenerativeModel(model_name=model_name, generation_config=generation_config)
+                # bind the per-key client so the model never falls back to the global default
+                model._client = self._client(api_key)
+                self._models[key] = model
+            return model
+
+    def _semaphore(self, api_key):
+        with self._lock:
+            slot = self._slots.get(api_key)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.max_concurrency)
+                self._slots[api_key] = slot
+            return slot
+
+    # limits how many calls run at once for one key; raises GeminiBusy when no slot frees up in time
+    @contextmanager
+    def slot(self, api_key):
+        if self.max_concurrency <= 0:
+            yield
+            return
+        slot = self._semaphore(api_key)
+        if not slot.acquire(timeout=self.acquire_timeout):
+            with self._lock:
+                self.rejected += 1
+            raise GeminiBusy("Too many AI requests in progress, try again shortly")
+        try:
+            yield
+        finally:
+            slot.release()
+
+    def generate(self, api_key, contents, model_name=DEFAULT_MODEL, generation_config=None):
+        model = self.model(api_key, model_name, generation_config)
+        # the request's llm stage includes waiting for a slot, the histogram only the call itself
+        with stage("llm"), self.slot(api_key):
+            started = time.perf_counter()
+            try:
+                return model.generate_content(contents)
+            finally:
+                gemini_seconds.observe(time.perf_counter() - started, model_name)
+
+    # generate() with stream=True: yields the answer text piece by piece, holding the key's
+    # slot until the stream is used up or closed. waiting for the slot and for each piece is the
+    # request's llm stage, like in generate(); what the caller does between pieces (parsing,
+    # inserts) stays in its own stages
+    def stream(self, api_key, contents, model_name=DEFAULT_MODEL, generation_config=None):
+        model = self.model(api_key, model_name, generation_config)
+        with ExitStack() as held:
+            with stage("llm"):
+                held.enter_context(self.slot(api_key))
+                started = time.perf_counter()
+            try:
+                with stage("llm"):
+                    chunks = iter(model.generate_content(contents, stream=True))
+                while True:
+                    with stage("llm"):
+                        chunk = next(chunks, None)
+                    if chunk is None:
+                        return
+                    yield chunk.text
+            finally:
+                gemini_seconds.observe(time.perf_counter() - started, model_name)
+
+    def stats(self):
+        with self._lock:
+            return {"clients": len(self._clients), "models": len(self._models), "rejected": self.rejected}
+
+
+gemini = GeminiRegistry(Config.GEMINI_MAX_CONCURRENCY, Config.GEMINI_ACQUIRE_TIMEOUT)
@@ -0,0 +1,191 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import Config
+
+
+logger = logging.getLogger("instrumentation")
+
+# where a request's time goes; anything not covered by a stage is handler/serialization time
+STAGES = ("extraction", "llm", "json_parse", "db", "render")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# prometheus style histogram per label set, kept in memory for this process
+class Histogram:
+
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # label values -> [bucket counts..., count, sum]
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for label_values, counts in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, label_values, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.labels, label_values, le)} {counts[-2]}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {counts[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {counts[-2]}")
+        return lines
+
+
+request_seconds = Histogram("http_request_duration_seconds", "Wall time of a request, until the response is built.",
+                            ("route", "method", "status"), LATENCY_BUCKETS)
+stage_seconds = Histogram("http_request_stage_seconds", "Time a request spent in each stage.",
+                          ("route", "stage"), LATENCY_BUCKETS)
+request_queries = Histogram("http_request_queries", "SQL statements issued per request.",
+                            ("route",), QUERY_BUCKETS)
+gemini_seconds = Histogram("gemini_request_duration_seconds", "Latency of Gemini calls, from every thread.",
+                           ("model",), LATENCY_BUCKETS)
+HISTOGRAMS = (request_seconds, stage_seconds, request_queries, gemini_seconds)
+
+
+# per request: the stage totals and the statement count
+class RequestTimer:
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.open = set()
+        self.queries = 0
+        # set once the response is built; still None in teardown when the handler raised
+        self.elapsed = None
+        self.status = None
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+
+def _current():
+    return g.get("_request_timer") if has_request_context() else None
+
+
+# times a block as one stage of the current request. a no-op outside a request (worker
+# threads, cli) and inside a stage of the same name, so callers can nest them freely
+@contextmanager
+def stage(name):
+    timer = _current()
+    if timer is None or name in timer.open:
+        yield
+        return
+    timer.open.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.open.discard(name)
+        timer.add(name, time.perf_counter() - started)
+
+
+# every statement on every engine; counted and timed for the request running on this thread
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("_query_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    timer = _current()
+    if timer is not None:
+        timer.queries += 1
+        if "db" not in timer.open:
+            timer.add("db", elapsed)
+
+
+def _finish(timer):
+    elapsed = timer.elapsed if timer.elapsed is not None else time.perf_counter() - timer.started
+    status = timer.status or 500
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    request_seconds.observe(elapsed, route, request.method, str(status))
+    request_queries.observe(timer.queries, route)
+    for name, seconds in timer.stages.items():
+        stage_seconds.observe(seconds, route, name)
+    if Config.SLOW_REQUEST_MS > 0 and elapsed * 1000 >= Config.SLOW_REQUEST_MS:
+        breakdown = " ".join(f"{name}={timer.stages[name] * 1000:.1f}ms" for name in STAGES if name in timer.stages)
+        logger.warning("slow request %s %s %s %.1fms queries=%d %s", request.method, route,
+                       status, elapsed * 1000, timer.queries, breakdown)
+
+
+# wall time, stages and statement counts for every route of the blueprint except skip (endpoint names).
+# streamed bodies are timed until the response object is built, not until the last byte is sent.
+# recorded at teardown, which also runs for unhandled exceptions (counted as 500s) that never
+# reach after_request when they propagate
+def instrument(blueprint, skip=()):
+
+    @blueprint.before_request
+    def _start_timer():
+        if request.endpoint not in skip:
+            g._request_timer = RequestTimer()
+
+    @blueprint.after_request
+    def _stop_timer(response):
+        timer = g.get("_request_timer")
+        if timer is not None:
+            timer.elapsed = time.perf_counter() - timer.started
+            timer.status = response.status_code
+        return response
+
+    @blueprint.teardown_request
+    def _record(exc):
+        timer = g.pop("_request_timer", None)
+        if timer is not None:
+            _finish(timer)
+
+
+# prometheus text format: the histograms, then one gauge per numeric stat of each component
+def render_metrics(components):
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for component, stats in components.items():
+        for key, value in sorted(stats.items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"{component}_{key}"
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,99 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from models import db
+
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+# job state lives in a small sqlite file so every worker process on the host
+# can answer status polls, whichever worker picked up the job
+class JobStore:
+
+    def __init__(self, path, retention):
+        self.path = path
+        self.retention = retention
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL,"
+                " score_id INTEGER, error TEXT,"
+                " created REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, kind):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, created, updated) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, PENDING, now, now),
+            )
+            # finished jobs are only kept around long enough to be polled
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated < ?",
+                (DONE, FAILED, now - self.retention),
+            )
+        return job_id
+
+    def update(self, job_id, status, score_id=None, error=None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, score_id = ?, error = ?, updated = ? WHERE id = ?",
+                (status, score_id, error, time.time(), job_id),
+            )
+
+    def get(self, job_id):
+        row = self._connect().execute(
+            "SELECT id, kind, status, score_id, error, created, updated FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        return dict(row) if row else None
+
+
+class JobQueue:
+
+    def __init__(self, store, workers):
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+
+    # fn runs on a pool thread inside an app context and returns the new score id
+    def submit(self, app, kind, fn, *args):
+        job_id = self.store.create(kind)
+        self._executor.submit(self._run, app, job_id, fn, args)
+        return job_id
+
+    def _run(self, app, job_id, fn, args):
+        with app.app_context():
+            self.store.update(job_id, RUNNING)
+            try:
+                score_id = fn(*args)
+            except Exception as e:
+                print(f"Job {job_id} failed: {e}")
+                self.store.update(job_id, FAILED, error=str(e))
+            else:
+                self.store.update(job_id, DONE, score_id=score_id)
+            finally:
+                db.session.remove()
+
+
+assessment_jobs = JobQueue(JobStore(Config.JOB_DB_PATH, Config.JOB_RETENTION), Config.JOB_WORKERS)
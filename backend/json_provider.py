@@ -0,0 +1,103 @@
+import dataclasses
+import decimal
+import enum
+import uuid
+from datetime import date
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+# both optional: without orjson the stdlib encoder is used, without msgpack every client gets JSON
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+MSGPACK_MIMETYPE = "application/msgpack"
+
+
+# types neither encoder handles the way the api always sent them; dates stay in the
+# http date format flask's default provider uses, so the wire format does not change
+def _default(o):
+    if isinstance(o, date):
+        return http_date(o)
+    if isinstance(o, decimal.Decimal):
+        # func.avg and friends come back as Decimal on mysql
+        return float(o)
+    if isinstance(o, enum.Enum):
+        return o.value
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    # sorted keys like the default provider. orjson has no ensure_ascii though: non-ascii text
+    # goes out as raw utf-8 ("Qué") where the stdlib wrote escapes ("Qu\u00e9"). both parse to
+    # the same value, but those bodies and their ETags differ from before, so a client holding an
+    # old ETag gets one full response instead of a 304
+    _ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+# app.json: orjson when it is installed, flask's stdlib provider otherwise
+class FastJSONProvider(DefaultJSONProvider):
+
+    default = staticmethod(_default)
+
+    def _dumpb(self, obj, indent=False):
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj, default=_default,
+                                    option=_ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0))
+            except orjson.JSONEncodeError:
+                # e.g. integers past 64 bits; the stdlib encoder still copes
+                pass
+        if indent:
+            return super().dumps(obj, indent=2).encode()
+        return super().dumps(obj, separators=(",", ":")).encode()
+
+    def dumps(self, obj, **kwargs):
+        # callers asking for stdlib options (cls, separators, ...) get the stdlib encoder
+        if kwargs or orjson is None:
+            return super().dumps(obj, **kwargs)
+        return self._dumpb(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs or orjson is None:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._dumpb(obj, indent) + b"\n", mimetype=self.mimetype)
+
+
+# true when the client asked for msgpack over json and we can produce it
+def wants_msgpack():
+    if msgpack is None:
+        return False
+    return request.accept_mimetypes.best_match(["application/json", MSGPACK_MIMETYPE]) == MSGPACK_MIMETYPE
+
+
+def packb(obj):
+    return msgpack.packb(obj, default=_default)
+
+
+# Accept-negotiated body for the heavy endpoints: msgpack when asked for, json otherwise
+def negotiate(obj):
+    if wants_msgpack():
+        response = current_app.response_class(packb(obj), mimetype=MSGPACK_MIMETYPE)
+    else:
+        response = current_app.json.response(obj)
+    response.vary.add("Accept")
+    return response
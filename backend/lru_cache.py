@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+# thread-safe in-memory LRU behind the process-local caches. bounded by entry count, or by
+# total size when sizeof is given (a value bigger than the whole limit is never kept).
+# entries can expire after ttl seconds, set for the cache or per put
+class LRUCache:
+
+    def __init__(self, limit, ttl=None, sizeof=None):
+        self.limit = limit
+        self.ttl = ttl
+        self.sizeof = sizeof
+        # key -> (expires_at or None, value, size), least recently used first
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # the cached value or None. expired entries, and ones valid(value) rejects, count as misses
+    def get(self, key, valid=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if (entry is not None and (entry[0] is None or entry[0] > time.monotonic())
+                    and (valid is None or valid(entry[1]))):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    # whether a live entry is there, without counting a lookup or touching the order
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and (entry[0] is None or entry[0] > time.monotonic())
+
+    def put(self, key, value, ttl=None):
+        size = self.sizeof(value) if self.sizeof else 1
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._pop(key)
+            if size > self.limit:
+                return
+            self._entries[key] = (expires_at, value, size)
+            self._size += size
+            while self._size > self.limit:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted
+                self.evictions += 1
+
+    # the removed value or None
+    def pop(self, key):
+        with self._lock:
+            return self._pop(key)
+
+    # removes every entry whose key passes test; a full scan, for the rare bulk invalidation
+    def pop_where(self, test):
+        with self._lock:
+            for key in [key for key in self._entries if test(key)]:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "size": self._size,
+                "evictions": self.evictions,
+            }
+
+    # caller holds the lock
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self._size -= entry[2]
+        return entry[1]
@@ -0,0 +1,39 @@
+"""add indexes for score and question access paths
+
+Revision ID: 4c8e1f2a9b3d
+Revises: 2600ada85cc9
+Create Date: 2026-10-18 10:12:41.208315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c8e1f2a9b3d'
+down_revision: Union[str, None] = '2600ada85cc9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # user_id + time ranges: total_assessment, analysis, sub_analysis, performance_analysis, recent_activity
+    op.create_index('ix_score_user_id_time', 'score', ['user_id', 'time'], unique=False)
+    # user_id + status + due_date: pending
+    op.create_index('ix_score_user_id_status_due_date', 'score', ['user_id', 'status', 'due_date'], unique=False)
+    # score_id: start, preview, submitting
+    op.create_index('ix_question_score_id', 'question', ['score_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # mysql dropped its implicit foreign key indexes when these were created,
+    # so put them back before removing ours
+    op.create_index('user_id', 'score', ['user_id'], unique=False)
+    op.create_index('score_id', 'question', ['score_id'], unique=False)
+    op.drop_index('ix_question_score_id', table_name='question')
+    op.drop_index('ix_score_user_id_status_due_date', table_name='score')
+    op.drop_index('ix_score_user_id_time', table_name='score')
@@ -0,0 +1,29 @@
+"""add score status due_date index for the expiry sweeper
+
+Revision ID: 7d2b5e9c0a14
+Revises: 4c8e1f2a9b3d
+Create Date: 2026-10-18 11:40:07.531902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2b5e9c0a14'
+down_revision: Union[str, None] = '4c8e1f2a9b3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # status + due_date: overdue pending assessments across all users
+    op.create_index('ix_score_status_due_date', 'score', ['status', 'due_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_score_status_due_date', table_name='score')
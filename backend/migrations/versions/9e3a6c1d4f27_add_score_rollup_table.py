@@ -0,0 +1,64 @@
+"""add score_rollup table
+
+Revision ID: 9e3a6c1d4f27
+Revises: 7d2b5e9c0a14
+Create Date: 2026-10-18 13:05:52.914470
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e3a6c1d4f27'
+down_revision: Union[str, None] = '7d2b5e9c0a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('score_rollup',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('subject', sa.String(length=100), nullable=False),
+    sa.Column('topic', sa.String(length=100), nullable=False),
+    sa.Column('difficulty', sa.Enum('easy', 'medium', 'hard', 'expert', name='difficulty'), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('sum_score', sa.Integer(), nullable=False),
+    sa.Column('scored_count', sa.Integer(), nullable=False),
+    sa.Column('completed_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'year', 'month', 'subject', 'topic', 'difficulty', name='uq_score_rollup_bucket')
+    )
+    # roll up the existing assessments, the analytics read only this table now;
+    # flask --app app backfill-rollup rebuilds it the same way
+    score = sa.table('score',
+        sa.column('user_id'), sa.column('id'), sa.column('subject'), sa.column('topic'),
+        sa.column('difficulty'), sa.column('status'), sa.column('time'), sa.column('score'))
+    score_rollup = sa.table('score_rollup',
+        sa.column('user_id'), sa.column('year'), sa.column('month'), sa.column('subject'), sa.column('topic'),
+        sa.column('difficulty'), sa.column('count'), sa.column('sum_score'), sa.column('scored_count'),
+        sa.column('completed_count'))
+    year = sa.cast(sa.extract('year', score.c.time), sa.Integer)
+    month = sa.cast(sa.extract('month', score.c.time), sa.Integer)
+    op.execute(score_rollup.insert().from_select(
+        ['user_id', 'year', 'month', 'subject', 'topic', 'difficulty', 'count', 'sum_score', 'scored_count', 'completed_count'],
+        sa.select(
+            score.c.user_id, year, month, score.c.subject, score.c.topic, score.c.difficulty,
+            sa.func.count(score.c.id),
+            sa.func.coalesce(sa.func.sum(score.c.score), 0),
+            sa.func.count(score.c.score),
+            sa.func.coalesce(sa.func.sum(sa.case((score.c.status == 'completed', 1), else_=0)), 0),
+        ).group_by(score.c.user_id, year, month, score.c.subject, score.c.topic, score.c.difficulty)
+    ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('score_rollup')
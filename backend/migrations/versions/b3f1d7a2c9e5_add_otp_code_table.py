@@ -0,0 +1,36 @@
+"""add otp_code table
+
+Revision ID: b3f1d7a2c9e5
+Revises: 9e3a6c1d4f27
+Create Date: 2026-10-18 14:22:09.517302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f1d7a2c9e5'
+down_revision: Union[str, None] = '9e3a6c1d4f27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('otp_code',
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('code_hash', sa.String(length=64), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('email')
+    )
+    op.create_index('ix_otp_code_expires_at', 'otp_code', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_otp_code_expires_at', table_name='otp_code')
+    op.drop_table('otp_code')
@@ -5,6 +5,7 @@ from sqlalchemy.dialects.mysql import JSON
 from sqlalchemy import Enum
 from datetime import datetime, timedelta
 import pytz
+from passwords import password_hasher
 
 
 
@@ -13,12 +14,21 @@ bcrypt = Bcrypt()
 
 #for timezone
 tz=pytz.timezone('Asia/Kolkata')
+# times are stored as naive local (Asia/Kolkata) times
+def local_now():
+    return datetime.now(tz).replace(tzinfo=None)
 #for status 
 class Status(enum.Enum):
     pending = "pending"
     completed = "completed"
     expired="expired"
     exit="exit"
+# for outgoing mail
+class MailStatus(enum.Enum):
+    pending = "pending"
+    sending = "sending"
+    sent = "sent"
+    failed = "failed"
 # for difficulty
 class Difficulty(enum.Enum):
     easy = "easy"
@@ -33,14 +43,16 @@ class User(db.Model):
     email = db.Column(db.String(255), unique=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
 
+    # both run in the password hashing pool and can raise HasherBusy
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return password_hasher.check(password, self.password_hash)
     # foreign keys for feedback and score
     feedback=db.relationship("feedback",backref="User",cascade="all, delete-orphan")
     Score=db.relationship("Score",backref="User",cascade="all, delete-orphan")
+    rollup=db.relationship("ScoreRollup",backref="User",cascade="all, delete-orphan")
     
     
 # feedback model
@@ -65,6 +77,15 @@ class Score(db.Model):
     answer=db.relationship("Question",backref="score",cascade="all, delete-orphan")
     score=db.Column(db.Integer,nullable=True)
 
+    # user_id + time ranges: analytics and recent activity
+    # user_id + status + due_date: pending assessments
+    # status + due_date: expiry sweeper across all users
+    __table_args__ = (
+        db.Index("ix_score_user_id_time", "user_id", "time"),
+        db.Index("ix_score_user_id_status_due_date", "user_id", "status", "due_date"),
+        db.Index("ix_score_status_due_date", "status", "due_date"),
+    )
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         if not self.due_date:
@@ -81,13 +102,67 @@ class Question(db.Model):
     is_correct=db.Column(db.String(1),nullable=False)
     time = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(tz))
 
-    # Method to check if the question is expired and delete expired questions from question table
-    @staticmethod
-    def delete_expired(r):
-        Question.query.filter_by(score_id=r.id).delete(synchronize_session=False)
-        # Update the status of the score table to expired
-        Score.query.filter_by(id=r.id).update({Score.status:Status.expired})
-        return db.session.commit()
-        
+    # questions are always read by assessment
+    __table_args__ = (
+        db.Index("ix_question_score_id", "score_id"),
+    )
+
+# per-user monthly analytics, kept in step with the score table by rollup.py
+class ScoreRollup(db.Model):
+    __tablename__ = "score_rollup"
+    id=db.Column(db.Integer,primary_key=True,nullable=False)
+    user_id=db.Column(db.Integer,db.ForeignKey(User.id),nullable=False)
+    year=db.Column(db.Integer,nullable=False)
+    month=db.Column(db.Integer,nullable=False)
+    subject=db.Column(db.String(100),nullable=False)
+    topic=db.Column(db.String(100),nullable=False)
+    difficulty=db.Column(Enum(Difficulty),nullable=False)
+    # assessments created in the month
+    count=db.Column(db.Integer,nullable=False,default=0)
+    # sum and number of non null scores, so averages match AVG(score)
+    sum_score=db.Column(db.Integer,nullable=False,default=0)
+    scored_count=db.Column(db.Integer,nullable=False,default=0)
+    completed_count=db.Column(db.Integer,nullable=False,default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "year", "month", "subject", "topic", "difficulty", name="uq_score_rollup_bucket"),
+    )
+
+
+# password reset codes; only a keyed hash of the code is stored
+class OTPCode(db.Model):
+    __tablename__ = "otp_code"
+    email=db.Column(db.String(255),primary_key=True,nullable=False)
+    code_hash=db.Column(db.String(64),nullable=False)
+    expires_at=db.Column(db.DateTime,nullable=False)
+    # wrong guesses so far
+    attempts=db.Column(db.Integer,nullable=False,default=0)
 
+    __table_args__ = (
+        db.Index("ix_otp_code_expires_at", "expires_at"),
+    )
+
+
+# mail written by request handlers in their own transaction, sent later by the outbox sender
+class MailOutbox(db.Model):
+    __tablename__ = "mail_outbox"
+    id=db.Column(db.Integer,primary_key=True,nullable=False)
+    subject=db.Column(db.String(255),nullable=False)
+    sender=db.Column(db.String(255),nullable=True)
+    recipients=db.Column(JSON,nullable=False)
+    reply_to=db.Column(db.String(255),nullable=True)
+    body=db.Column(db.Text,nullable=False)
+    status=db.Column(Enum(MailStatus),nullable=False,default=MailStatus.pending)
+    attempts=db.Column(db.Integer,nullable=False,default=0)
+    # earliest next send for pending rows, end of the claim lease for sending rows
+    next_attempt_at=db.Column(db.DateTime,nullable=False,default=local_now)
+    # sender run that holds the row while it is sending
+    claimed_by=db.Column(db.String(32),nullable=True)
+    last_error=db.Column(db.Text,nullable=True)
+    created_at=db.Column(db.DateTime,nullable=False,default=local_now)
+    sent_at=db.Column(db.DateTime,nullable=True)
 
+    __table_args__ = (
+        db.Index("ix_mail_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+        db.Index("ix_mail_outbox_claimed_by", "claimed_by"),
+    )
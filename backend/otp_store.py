@@ -0,0 +1,191 @@
+import abc
+import hashlib
+import heapq
+import hmac
+import threading
+import time
+from datetime import timedelta
+from sqlalchemy import update, delete
+from sqlalchemy.exc import IntegrityError
+from models import db,OTPCode,local_now
+from config import Config
+
+
+# results of OTPStore.verify
+OTP_OK = "ok"
+OTP_INVALID = "invalid"
+OTP_LOCKED = "locked"
+
+
+# one live otp per email: put() replaces it, it expires after ttl seconds,
+# verify() consumes it on success and locks it after max_attempts wrong guesses
+class OTPStore(abc.ABC):
+
+    def __init__(self, ttl, max_attempts):
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+
+    # keyed hash, so a leaked store (table dump, redis snapshot) does not leak live codes
+    @staticmethod
+    def digest(email, otp):
+        key = (Config.SECRET_KEY or "").encode()
+        return hmac.new(key, f"{email}\0{otp}".encode(), hashlib.sha256).hexdigest()
+
+    @abc.abstractmethod
+    def put(self, email, otp):
+        pass
+
+    # one of OTP_OK, OTP_INVALID, OTP_LOCKED
+    @abc.abstractmethod
+    def verify(self, email, otp):
+        pass
+
+
+# single process only; expired entries are dropped lazily off a heap ordered by expiry
+class MemoryOTPStore(OTPStore):
+
+    def __init__(self, ttl, max_attempts):
+        super().__init__(ttl, max_attempts)
+        # email -> [digest, expires_at, attempts]
+        self._entries = {}
+        self._expiry = []
+        self._lock = threading.Lock()
+
+    # caller holds the lock
+    def _purge(self, now):
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, email = heapq.heappop(self._expiry)
+            entry = self._entries.get(email)
+            # the heap still holds the expiry of otps that were replaced since
+            if entry is not None and entry[1] == expires_at:
+                del self._entries[email]
+
+    def put(self, email, otp):
+        now = time.monotonic()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._purge(now)
+            self._entries[email] = [self.digest(email, otp), expires_at, 0]
+            heapq.heappush(self._expiry, (expires_at, email))
+
+    def verify(self, email, otp):
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            entry = self._entries.get(email)
+            if entry is None:
+                return OTP_INVALID
+            if entry[2] >= self.max_attempts:
+                return OTP_LOCKED
+            if hmac.compare_digest(entry[0], self.digest(email, otp)):
+                del self._entries[email]
+                return OTP_OK
+            entry[2] += 1
+            return OTP_INVALID
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# shared by every worker through the otp_code table; needs an app context
+class SQLOTPStore(OTPStore):
+
+    # not committed here: the caller commits, so the code is stored in the same transaction as
+    # whatever else the request writes (the outbox mail in /send-otp)
+    def put(self, email, otp):
+        now = local_now()
+        values = {"code_hash": self.digest(email, otp), "expires_at": now + timedelta(seconds=self.ttl), "attempts": 0}
+        db.session.execute(delete(OTPCode).where(OTPCode.expires_at <= now))
+        replaced = db.session.execute(
+            update(OTPCode).where(OTPCode.email == email).values(**values)
+        ).rowcount
+        if not replaced:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(OTPCode(email=email, **values))
+            except IntegrityError:
+                # another request for the same email inserted first, the newest code wins
+                db.session.execute(update(OTPCode).where(OTPCode.email == email).values(**values))
+
+    def verify(self, email, otp):
+        now = local_now()
+        try:
+            live = (OTPCode.email == email, OTPCode.expires_at > now)
+            consumed = db.session.execute(
+                delete(OTPCode).where(*live, OTPCode.attempts < self.max_attempts,
+                                      OTPCode.code_hash == self.digest(email, otp))
+            ).rowcount
+            if consumed:
+                db.session.commit()
+                return OTP_OK
+            # counted in SQL, so concurrent guesses on other workers are all counted
+            counted = db.session.execute(
+                update(OTPCode).where(*live, OTPCode.attempts < self.max_attempts)
+                .values(attempts=OTPCode.attempts + 1)
+            ).rowcount
+            locked = not counted and db.session.query(OTPCode.email).filter(*live).first() is not None
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return OTP_LOCKED if locked else OTP_INVALID
+
+
+# shared through redis; the key ttl does the expiry. client is a redis.Redis
+# (or fakeredis.FakeRedis) created with decode_responses=True
+class RedisOTPStore(OTPStore):
+
+    def __init__(self, ttl, max_attempts, client):
+        super().__init__(ttl, max_attempts)
+        self.client = client
+
+    @staticmethod
+    def _key(email):
+        return f"otp:{email}"
+
+    def put(self, email, otp):
+        key = self._key(email)
+        with self.client.pipeline() as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping={"digest": self.digest(email, otp), "attempts": 0})
+            pipe.expire(key, self.ttl)
+            pipe.execute()
+
+    def verify(self, email, otp):
+        key = self._key(email)
+        digest = self.digest(email, otp)
+
+        # WATCH/MULTI, retried by redis-py when another client touches the key in between
+        def check(pipe):
+            entry = pipe.hgetall(key)
+            if not entry:
+                return OTP_INVALID
+            if int(entry["attempts"]) >= self.max_attempts:
+                return OTP_LOCKED
+            pipe.multi()
+            if hmac.compare_digest(entry["digest"], digest):
+                pipe.delete(key)
+                return OTP_OK
+            pipe.hincrby(key, "attempts", 1)
+            return OTP_INVALID
+
+        return self.client.transaction(check, key, value_from_callable=True)
+
+
+def make_otp_store(kind=None):
+    kind = kind or Config.OTP_STORE
+    if kind == "memory":
+        return MemoryOTPStore(Config.OTP_TTL, Config.OTP_MAX_ATTEMPTS)
+    if kind == "sql":
+        return SQLOTPStore(Config.OTP_TTL, Config.OTP_MAX_ATTEMPTS)
+    if kind == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("OTP_STORE=redis needs the redis package (pip install redis)")
+        client = redis.Redis.from_url(Config.REDIS_URL, decode_responses=True)
+        return RedisOTPStore(Config.OTP_TTL, Config.OTP_MAX_ATTEMPTS, client)
+    raise ValueError(f"Unknown OTP_STORE {kind!r}, use memory, sql or redis")
+
+
+otp_store = make_otp_store()
@@ -0,0 +1,285 @@
+import random
+import smtplib
+import threading
+import time
+import uuid
+from datetime import timedelta
+import click
+from flask_mail import Message
+from sqlalchemy import select, update, or_, func
+from extensions import mail
+from models import db,MailOutbox,MailStatus,local_now
+from config import Config
+
+
+
+# adds the mail to the caller's transaction; it is only sent once the caller commits
+def enqueue(subject, recipients, body, sender=None, reply_to=None):
+    row = MailOutbox(
+        subject=subject,
+        sender=sender,
+        recipients=list(recipients),
+        reply_to=reply_to,
+        body=body,
+        next_attempt_at=local_now(),
+    )
+    db.session.add(row)
+    return row
+
+
+# numbers from the outbox sender in this process
+class OutboxStats:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.connections = 0
+        self.last_error = None
+        self.last_batch_duration = 0.0
+
+    def record(self, sent, retried, failed, duration):
+        with self._lock:
+            self.batches += 1
+            self.sent += sent
+            self.retried += retried
+            self.failed += failed
+            self.last_batch_duration = duration
+
+    def connected(self):
+        with self._lock:
+            self.connections += 1
+
+    def error(self, message):
+        with self._lock:
+            self.last_error = message
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "sent": self.sent,
+                "retried": self.retried,
+                "failed": self.failed,
+                "connections": self.connections,
+                "last_error": self.last_error,
+                "last_batch_duration": self.last_batch_duration,
+            }
+
+
+outbox_stats = OutboxStats()
+
+
+# pending mail by status, for metrics
+def queue_depth():
+    rows = db.session.execute(select(MailOutbox.status, func.count()).group_by(MailOutbox.status)).all()
+    return {status.value: count for status, count in rows}
+
+
+# claims up to batch_size due rows for this sender. a row stuck in "sending" past its lease
+# (sender died mid batch) is due again, so nothing is lost; it may be sent twice in that case
+def claim(batch_size):
+    now = local_now()
+    token = uuid.uuid4().hex
+    due = or_(MailOutbox.status == MailStatus.pending, MailOutbox.status == MailStatus.sending)
+    ids = db.session.execute(
+        select(MailOutbox.id)
+        .where(due, MailOutbox.next_attempt_at <= now)
+        .order_by(MailOutbox.id)
+        .limit(batch_size)
+    ).scalars().all()
+    if not ids:
+        return []
+    # the where clause is repeated so a row another sender claimed in between is skipped
+    db.session.execute(
+        update(MailOutbox)
+        .where(MailOutbox.id.in_(ids), due, MailOutbox.next_attempt_at <= now)
+        .values(status=MailStatus.sending, claimed_by=token,
+                next_attempt_at=now + timedelta(seconds=Config.MAIL_CLAIM_LEASE)),
+        execution_options={"synchronize_session": False},
+    )
+    db.session.commit()
+    return db.session.execute(
+        select(MailOutbox).where(MailOutbox.claimed_by == token, MailOutbox.status == MailStatus.sending)
+        .order_by(MailOutbox.id)
+    ).scalars().all()
+
+
+def _message(row):
+    msg = Message(subject=row.subject, sender=row.sender, recipients=row.recipients, body=row.body)
+    if row.reply_to:
+        msg.reply_to = row.reply_to
+    return msg
+
+
+# exponential backoff with jitter, capped
+def backoff(attempts):
+    delay = min(Config.MAIL_RETRY_BASE * 2 ** (attempts - 1), Config.MAIL_RETRY_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _failed(row, error, now):
+    row.attempts += 1
+    row.last_error = str(error)[:2000]
+    row.claimed_by = None
+    if row.attempts >= Config.MAIL_MAX_ATTEMPTS:
+        row.status = MailStatus.failed
+        return False
+    row.status = MailStatus.pending
+    row.next_attempt_at = now + timedelta(seconds=backoff(row.attempts))
+    return True
+
+
+# the smtp connection stays open across batches while there is mail to send
+class MailSender:
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or Config.MAIL_OUTBOX_BATCH
+        self._connection = None
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = mail.connect().__enter__()
+            outbox_stats.connected()
+        return self._connection
+
+    def close(self):
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            try:
+                connection.__exit__(None, None, None)
+            except (smtplib.SMTPException, OSError):
+                pass
+
+    # sends one batch, returns the number of rows it claimed
+    def send_batch(self):
+        rows = claim(self.batch_size)
+        if not rows:
+            return 0
+        started = time.perf_counter()
+        sent = retried = failed = 0
+        try:
+            connection = self._connect()
+        except (smtplib.SMTPException, OSError) as e:
+            # relay unreachable: the whole batch backs off
+            outbox_stats.error(f"connect: {e}")
+            now = local_now()
+            for row in rows:
+                if _failed(row, e, now):
+                    retried += 1
+                else:
+                    failed += 1
+            db.session.commit()
+            outbox_stats.record(sent, retried, failed, time.perf_counter() - started)
+            return len(rows)
+
+        for row in rows:
+            try:
+                connection.send(_message(row))
+            except (smtplib.SMTPServerDisconnected, OSError) as e:
+                # the connection is gone: this row is retried and the rest reconnect
+                self.close()
+                outbox_stats.error(str(e))
+                if _failed(row, e, local_now()):
+                    retried += 1
+                else:
+                    failed += 1
+                try:
+                    connection = self._connect()
+                except (smtplib.SMTPException, OSError):
+                    break
+                continue
+            except Exception as e:
+                # refused recipient, bad headers ...
+                outbox_stats.error(str(e))
+                if _failed(row, e, local_now()):
+                    retried += 1
+                else:
+                    failed += 1
+                continue
+            row.status = MailStatus.sent
+            row.sent_at = local_now()
+            row.claimed_by = None
+            sent += 1
+        # rows left claimed after a lost connection are released for the next batch
+        for row in rows:
+            if row.status == MailStatus.sending:
+                row.status = MailStatus.pending
+                row.claimed_by = None
+                row.next_attempt_at = local_now()
+        db.session.commit()
+        outbox_stats.record(sent, retried, failed, time.perf_counter() - started)
+        return len(rows)
+
+    # sends until nothing is due, returns the number of rows claimed
+    def drain(self):
+        total = 0
+        while True:
+            claimed = self.send_batch()
+            total += claimed
+            if claimed < self.batch_size:
+                return total
+
+
+def _send_loop(app, interval):
+    sender = MailSender()
+    while True:
+        with app.app_context():
+            try:
+                claimed = sender.drain()
+            except Exception:
+                claimed = 0
+                db.session.rollback()
+                app.logger.exception("Mail outbox run failed")
+            finally:
+                db.session.remove()
+        if not claimed:
+            # idle: let the relay connection go, the next mail opens a new one
+            sender.close()
+            time.sleep(interval)
+
+
+def start_sender(app, interval):
+    thread = threading.Thread(target=_send_loop, args=(app, interval), name="mail-outbox", daemon=True)
+    thread.start()
+    return thread
+
+
+_sender = None
+_sender_lock = threading.Lock()
+
+
+# the in-process sender, one per worker process. init_outbox starts it on the first request the
+# process serves, so gunicorn workers, flask run and python app.py all get one, while cli commands
+# and spawned pool workers, which serve no requests, never do. safe to call again: a worker forked
+# from a process that had one gets its own, since threads do not survive the fork.
+# with MAIL_OUTBOX_INTERVAL=0 nothing is sent in-process; run flask --app app send-mail from cron
+def start_outbox(app):
+    global _sender
+    if app.config["MAIL_OUTBOX_INTERVAL"] <= 0:
+        return None
+    if _sender is not None and _sender.is_alive():
+        return _sender
+    with _sender_lock:
+        if _sender is None or not _sender.is_alive():
+            _sender = start_sender(app, app.config["MAIL_OUTBOX_INTERVAL"])
+        return _sender
+
+
+def init_outbox(app):
+    # for cron: flask --app app send-mail
+    @app.cli.command("send-mail")
+    @click.option("--batch-size", type=int, default=None)
+    def send_mail(batch_size):
+        sender = MailSender(batch_size)
+        try:
+            claimed = sender.drain()
+        finally:
+            sender.close()
+        click.echo(f"Processed {claimed} mails: {outbox_stats.snapshot()}")
+
+    @app.before_request
+    def _start_outbox():
+        start_outbox(app)
@@ -0,0 +1,47 @@
+import base64
+from datetime import datetime
+from sqlalchemy import or_, and_
+from config import Config
+
+
+class BadCursor(Exception):
+    pass
+
+
+# opaque cursor for the last row of a page: its (time, id)
+def encode_cursor(time, id):
+    raw = f"{time.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        time, id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(time), int(id)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise BadCursor("Invalid cursor")
+
+
+def page_size(requested):
+    try:
+        size = int(requested) if requested is not None else Config.PAGE_SIZE_DEFAULT
+    except (TypeError, ValueError):
+        size = Config.PAGE_SIZE_DEFAULT
+    return max(1, min(size, Config.PAGE_SIZE_MAX))
+
+
+# newest first by (time, id); the page after the cursor is an index range scan,
+# so it costs the same however far back the user pages.
+# returns (rows, next cursor or None)
+def keyset_page(query, time_column, id_column, cursor=None, limit=None):
+    limit = page_size(limit)
+    if cursor:
+        time, id = decode_cursor(cursor)
+        query = query.filter(or_(time_column < time, and_(time_column == time, id_column < id)))
+    rows = query.order_by(time_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, time_column.key), getattr(last, id_column.key))
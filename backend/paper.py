@@ -0,0 +1,75 @@
+import hashlib
+import json
+import random
+import re
+from dataclasses import dataclass, field, asdict
+
+
+# the question paper as generated by gemini, independent of the export format
+@dataclass
+class Section:
+    marks: str
+    questions: list = field(default_factory=list)
+
+    # "2 mark" x 5 questions -> 10, empty when the marks are not a number
+    @property
+    def total(self):
+        if self.marks and self.marks[0].isdigit():
+            return len(self.questions) * int(self.marks.split()[0])
+        return ""
+
+
+@dataclass
+class Paper:
+    title: str
+    sections: list = field(default_factory=list)
+
+    # built from the parsed gemini json: {"Questions": [{"title": ...}, {"marks": ..., "questions": [...]}, ...]}
+    @classmethod
+    def from_model_output(cls, model_output):
+        items = model_output["Questions"]
+        return cls(
+            title=str(items[0].get("title", "No Title")).strip(),
+            sections=[
+                Section(
+                    marks=str(item.get("marks", "")).strip(),
+                    questions=[str(q).strip() for q in item.get("questions", [])],
+                )
+                for item in items[1:]
+            ],
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["title"], [Section(**section) for section in data["sections"]])
+
+    def to_dict(self):
+        return asdict(self)
+
+    # content hash, same paper -> same key whatever the whitespace in the gemini output
+    def key(self):
+        encoded = json.dumps(self.to_dict(), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+_numbering = re.compile(r"^\s*\d+\s*[.)]\s*")
+
+
+# "3. what is ai?" -> "what is ai?"
+def strip_numbering(question):
+    return _numbering.sub("", question)
+
+
+# k copies of the paper with the questions of every section in a different order,
+# renumbered; the same seed always gives the same variants
+def shuffled_variants(paper, k, seed=None):
+    variants = []
+    for i in range(k):
+        rng = random.Random(f"{seed}:{i}")
+        sections = []
+        for section in paper.sections:
+            questions = [strip_numbering(q) for q in section.questions]
+            rng.shuffle(questions)
+            sections.append(Section(section.marks, [f"{n}. {q}" for n, q in enumerate(questions, 1)]))
+        variants.append(Paper(f"{paper.title} - Set {i + 1}", sections))
+    return variants
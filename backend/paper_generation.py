@@ -0,0 +1,173 @@
+import itertools
+import json,re
+import math
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from gemini_clients import gemini
+from assessments import GenerationError
+from paper import strip_numbering
+from instrumentation import stage
+
+
+def paper_prompt(syllabus, questionCount):
+    return f"""
+                Generate questions strictly based on the syllabus content provided .
+                 For each mark type (e.g., 2 mark, 5 mark), generate exactly {questionCount} questions.
+                Each question should be categorized by its corresponding mark allocation.
+                Ensure all questions are relevant to the syllabus and do not include any additional information.
+                Syllabus Content: {syllabus}
+                ### Response Format:
+                Your response **must be** a valid JSON dictionary.
+                Do **not** include any explanations, extra text, or formatting outside of JSON.
+                Strictly follow those keys only:
+                include the title also
+                {{
+                    "Questions":[{{"title":"Ai robotics"}},
+                   {{
+                    "marks":"2 mark",
+                    "questions":[
+                        "1. what is robotics ?",
+                        "2. what are recent innovation?"
+                         // ... up to {questionCount} questions
+                    ]
+                    }},
+                    {{
+                    "marks":"2 mark",
+                    "questions":[
+                        "1. what is ai ?",
+                        "2. what is machine learning?"
+                         // ... up to {questionCount} questions
+                    ]
+                    }}
+                    ]
+                }}
+                """
+
+
+# one prompt with the whole syllabus, returns the parsed {"Questions": [...]}
+def generate_paper(api_key, syllabus, questionCount):
+    model_response = gemini.generate(api_key, paper_prompt(syllabus, questionCount))
+    response_text = model_response.candidates[0].content.parts[0].text
+    clean_response = re.sub(r"```json\n|\n```", "", response_text).strip()
+    try:
+        with stage("json_parse"):
+            model_output = json.loads(clean_response)
+    except json.JSONDecodeError as e:
+        print("JSON Decode Error:", e)
+        raise GenerationError("AI did not return valid JSON")
+    if not model_output:
+        raise GenerationError("AI model did not generate any content")
+    return model_output
+
+
+# the extractor writes "Page N:" before every pdf page; syllabi also split well on unit/chapter headings
+_boundary = re.compile(r"(?im)^(?=page \d+:|(?:unit|chapter|module)\b[\s:.\-]*[\divx]+|#{1,3} )")
+
+
+# splits the syllabus on page / heading boundaries and packs the pieces into chunks of at most max_chars
+def split_syllabus(text, max_chars=None):
+    max_chars = max_chars or Config.PAPER_CHUNK_CHARS
+    pieces = []
+    for block in _boundary.split(text):
+        # a single page or unit bigger than a chunk is cut on paragraphs, then hard
+        while len(block) > max_chars:
+            cut = block.rfind("\n\n", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            pieces.append(block[:cut])
+            block = block[cut:]
+        pieces.append(block)
+
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += piece
+    if current.strip():
+        chunks.append(current)
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+# "2 mark", "2 Marks", "2-mark" all go in the same section
+def _marks_key(marks):
+    match = re.match(r"\s*(\d+)", marks)
+    return match.group(1) if match else marks.strip().lower()
+
+
+def _question_key(question):
+    return re.sub(r"[^a-z0-9]+", " ", question.lower()).strip()
+
+
+# merges the per-chunk outputs into one {"Questions": [...]}: one section per mark type,
+# duplicates dropped, questions taken round-robin across chunks so every part of the
+# syllabus is covered, at most question_count per section, renumbered
+def merge_papers(outputs, question_count):
+    title = None
+    sections = OrderedDict()
+    for output in outputs:
+        if not isinstance(output, dict):
+            continue
+        for item in output.get("Questions") or []:
+            if not isinstance(item, dict):
+                continue
+            if "marks" not in item:
+                title = title or item.get("title")
+                continue
+            marks = str(item.get("marks", "")).strip()
+            label, per_chunk = sections.setdefault(_marks_key(marks), (marks, []))
+            per_chunk.append([strip_numbering(str(q)).strip() for q in item.get("questions", [])])
+
+    merged = [{"title": title or "No Title"}]
+    for label, per_chunk in sections.values():
+        seen = set()
+        picked = []
+        for question in itertools.chain.from_iterable(itertools.zip_longest(*per_chunk)):
+            if len(picked) == question_count:
+                break
+            key = _question_key(question or "")
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            picked.append(question)
+        merged.append({"marks": label, "questions": [f"{n}. {q}" for n, q in enumerate(picked, 1)]})
+    return {"Questions": merged}
+
+
+# joins neighbouring chunks into at most `groups` parts of about the same number of chunks,
+# keeping the syllabus order
+def group_chunks(chunks, groups):
+    groups = max(1, min(groups, len(chunks)))
+    bounds = [round(i * len(chunks) / groups) for i in range(groups + 1)]
+    return ["".join(chunks[start:end]) for start, end in zip(bounds, bounds[1:])]
+
+
+# map-reduce over the syllabus chunks: every chunk is asked for its share of the questions
+# (plus one spare for de-duplication) concurrently, failed chunks are reported, not fatal.
+# never more chunks than questions, so every call contributes to the merge.
+# returns (model_output, warnings)
+def generate_paper_chunked(api_key, syllabus, question_count, max_chars=None, workers=None):
+    chunks = group_chunks(split_syllabus(syllabus, max_chars), question_count)
+    if len(chunks) <= 1:
+        return generate_paper(api_key, syllabus, question_count), []
+    per_chunk = math.ceil(question_count / len(chunks)) + 1
+    workers = min(workers or Config.PAPER_CHUNK_WORKERS, len(chunks))
+
+    def generate_chunk(chunk):
+        try:
+            return generate_paper(api_key, chunk, per_chunk), None
+        except Exception as e:
+            return None, e
+
+    # the pool threads are outside the request, so the whole fan-out is the request's llm stage
+    with stage("llm"), ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(generate_chunk, chunks))
+
+    outputs = [output for output, _ in results if output]
+    errors = [(n, error) for n, (_, error) in enumerate(results, 1) if error is not None]
+    if not outputs:
+        raise errors[0][1]
+    warnings = [f"Syllabus part {n} of {len(chunks)} skipped: {error}" for n, error in errors]
+    return merge_papers(outputs, question_count), warnings
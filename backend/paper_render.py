@@ -0,0 +1,193 @@
+import os
+import re
+import shutil
+import tempfile
+import threading
+import zipfile
+from io import BytesIO
+from reportlab.lib.enums import TA_LEFT, TA_RIGHT
+from reportlab.platypus import SimpleDocTemplate,Paragraph,Spacer,Table,TableStyle
+from reportlab.lib.styles import getSampleStyleSheet,ParagraphStyle
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from docx import Document
+from config import Config
+from process_pool import ProcessPool
+from disk_cache import DiskCache
+from lru_cache import LRUCache
+from paper import Paper,Section
+
+
+# built once per process and shared by every render, reportlab only reads them
+styles = getSampleStyleSheet()
+left_style = ParagraphStyle(name="LeftAlign", parent=styles["Heading2"], alignment=TA_LEFT)
+right_style = ParagraphStyle(name="RightAlign", parent=styles["Heading2"], alignment=TA_RIGHT)
+marks_table_style = TableStyle([
+    ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+    ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+])
+
+
+def build_pdf(paper, out):
+    doc = SimpleDocTemplate(out, pagesize=A4)
+    elements = []
+
+    # Title
+    elements.append(Paragraph(f"<b>{paper.title}</b>", styles["Title"]))
+    elements.append(Spacer(1, 10))
+
+    for section in paper.sections:
+        data = [
+            [
+                Paragraph(f"<b>{section.marks} marks</b>", left_style),
+                Paragraph(f"<b>{section.marks} x {len(section.questions)} = {section.total}</b>", right_style)
+            ]
+        ]
+        table = Table(data, colWidths=[200, 200])
+        table.setStyle(marks_table_style)
+        elements.append(table)
+        elements.append(Spacer(1, 10))
+        for question in section.questions:
+            elements.append(Paragraph(f"&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;{question}", styles["Normal"]))
+            elements.append(Spacer(1, 13))
+        elements.append(Spacer(1, 12))
+
+    doc.build(elements)
+
+
+def build_docx(paper, out):
+    document = Document()
+    document.add_heading(paper.title, level=0)
+    for section in paper.sections:
+        heading = document.add_heading(level=2)
+        heading.add_run(f"{section.marks} marks")
+        heading.add_run(f"\t{section.marks} x {len(section.questions)} = {section.total}")
+        for question in section.questions:
+            document.add_paragraph(question)
+    document.save(out)
+
+
+# format -> (builder(paper, binary file), mimetype)
+EXPORTERS = {
+    "pdf": (build_pdf, "application/pdf"),
+    "docx": (build_docx, "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+}
+
+
+_key_pattern = re.compile(r"[0-9a-f]{64}")
+
+
+# rendered papers by (paper key, format)
+# memory tier: papers up to the spool threshold, LRU bounded by total bytes
+# disk tier: bigger papers, one file per key and format, least recently used evicted past the disk limit
+class PaperCache:
+
+    def __init__(self, limit, directory, disk_limit, max_entry):
+        self.directory = directory
+        self.memory = LRUCache(limit, sizeof=len)
+        self.disk = DiskCache(directory, disk_limit) if directory else None
+        self.max_entry = max_entry
+        self._lock = threading.Lock()
+        self.disk_hits = 0
+        self.misses = 0
+
+    # (binary file object, size) or None
+    def open(self, key, fmt="pdf"):
+        data = self.memory.get((key, fmt))
+        if data is not None:
+            return BytesIO(data), len(data)
+        # keys come from urls, only ever build paths from real hashes
+        if self.disk is not None and _key_pattern.fullmatch(key) and fmt in EXPORTERS:
+            f = self.disk.open(key + "." + fmt)
+            if f is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                return f, os.fstat(f.fileno()).st_size
+        with self._lock:
+            self.misses += 1
+        return None
+
+    # f is positioned at the start of the paper; it is read in chunks, never whole, for big papers
+    def put(self, key, fmt, f, size):
+        if size <= self.max_entry:
+            if size <= self.memory.limit:
+                self.memory.put((key, fmt), f.read())
+            return
+        if self.disk is None:
+            return
+        try:
+            self.disk.write(key + "." + fmt, lambda out: shutil.copyfileobj(f, out, Config.PAPER_CHUNK_SIZE))
+        except OSError as e:
+            print(f"Paper cache write failed: {e}")
+
+    def stats(self):
+        memory = self.memory.stats()
+        with self._lock:
+            stats = {"hits": memory["hits"], "disk_hits": self.disk_hits, "misses": self.misses,
+                     "entries": memory["entries"], "size": memory["size"]}
+        if self.disk is not None:
+            stats.update(self.disk.stats())
+        return stats
+
+
+paper_cache = PaperCache(
+    Config.PAPER_CACHE_LIMIT,
+    Config.PAPER_DIR,
+    Config.PAPER_DISK_LIMIT,
+    Config.PAPER_SPOOL_THRESHOLD,
+)
+
+
+# returns (key, binary file object, size), rendering only when this exact paper is not cached.
+# a fresh render goes to a spooled temp file that moves to disk past the spool threshold,
+# so a big paper is not held in worker memory while it is downloaded
+def render_paper(paper, fmt="pdf"):
+    key = paper.key()
+    cached = paper_cache.open(key, fmt)
+    if cached is not None:
+        return (key,) + cached
+    out = tempfile.SpooledTemporaryFile(max_size=Config.PAPER_SPOOL_THRESHOLD)
+    EXPORTERS[fmt][0](paper, out)
+    size = out.tell()
+    out.seek(0)
+    paper_cache.put(key, fmt, out, size)
+    out.seek(0)
+    return key, out, size
+
+
+pool = ProcessPool(Config.PAPER_EXPORT_WORKERS)
+
+
+# runs inside the pool, papers cross the process boundary as plain dicts
+def _render_variant(data, fmt):
+    out = BytesIO()
+    EXPORTERS[fmt][0](Paper.from_dict(data), out)
+    return out.getvalue()
+
+
+# renders every variant in the process pool and zips them, in order, into a spooled temp file.
+# returns (binary file object, size)
+def render_variants_zip(variants, fmt="pdf"):
+    futures = [pool.submit(_render_variant, variant.to_dict(), fmt) for variant in variants]
+    out = tempfile.SpooledTemporaryFile(max_size=Config.PAPER_SPOOL_THRESHOLD)
+    try:
+        # the documents are already compressed, storing them keeps the zip step cheap
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_STORED) as archive:
+            for n, future in enumerate(futures, 1):
+                archive.writestr(f"set-{n:02d}.{fmt}", future.result())
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        out.close()
+        raise
+    size = out.tell()
+    out.seek(0)
+    return out, size
+
+
+# first render pays for font metrics and style resolution, do it at worker start
+def warm_up():
+    build_pdf(Paper("Warm up", [Section("2 mark", ["1. warm up?"])]), BytesIO())
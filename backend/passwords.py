@@ -0,0 +1,102 @@
+import hmac
+import re
+import threading
+import bcrypt
+from config import Config
+from process_pool import ProcessPool
+
+
+class HasherBusy(Exception):
+    pass
+
+
+# run inside the pool; same hashes as flask_bcrypt, so existing rows keep working
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+
+def _check(password, pw_hash):
+    pw_hash = pw_hash.encode("utf-8")
+    return hmac.compare_digest(bcrypt.hashpw(password.encode("utf-8"), pw_hash), pw_hash)
+
+
+_cost = re.compile(r"^\$2[abxy]?\$(\d{2})\$")
+
+
+# bcrypt work runs in a bounded process pool so a login storm cannot pin every request thread.
+# at most workers + max_queue hashes are in flight; past that callers get HasherBusy straight away
+# instead of queueing behind work that will not finish in time. workers = 0 hashes inline
+class PasswordHasher:
+
+    def __init__(self, rounds, workers, max_queue, timeout):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool = ProcessPool(workers)
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def shutdown(self):
+        self._pool.shutdown()
+
+    # frees the in-flight slot once the work is finished or was cancelled while queued
+    def _done(self, future):
+        with self._lock:
+            self._inflight -= 1
+            if not future.cancelled():
+                self.completed += 1
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        with self._lock:
+            if self._inflight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HasherBusy("Too many logins right now, try again shortly")
+            self._inflight += 1
+        try:
+            future = self._pool.submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self._inflight -= 1
+            raise
+        future.add_done_callback(self._done)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # a queued hash is dropped (its callback frees the slot); one already running
+            # keeps its slot until it finishes, so the bound on in-flight work still holds
+            future.cancel()
+            with self._lock:
+                self.rejected += 1
+            raise HasherBusy("Too many logins right now, try again shortly")
+
+    def hash(self, password):
+        if not password:
+            raise ValueError("Password must be non-empty.")
+        return self._run(_hash, password, self.rounds)
+
+    def check(self, password, pw_hash):
+        if not password or not pw_hash:
+            return False
+        return self._run(_check, password, pw_hash)
+
+    # true when the hash was made with a different cost than the configured one
+    def needs_rehash(self, pw_hash):
+        match = _cost.match(pw_hash or "")
+        return match is None or int(match.group(1)) != self.rounds
+
+    def stats(self):
+        with self._lock:
+            return {"inflight": self._inflight, "completed": self.completed, "rejected": self.rejected}
+
+
+password_hasher = PasswordHasher(
+    Config.BCRYPT_LOG_ROUNDS,
+    Config.BCRYPT_WORKERS,
+    Config.BCRYPT_MAX_QUEUE,
+    Config.BCRYPT_TIMEOUT,
+)
@@ -0,0 +1,51 @@
+import hashlib
+from config import Config
+from lru_cache import LRUCache
+
+
+# serialized /start and /preview bodies per (kind, score id) with their ETag, bounded LRU.
+# questions never change after generation, so an entry stays good until the assessment is
+# answered or expired; callers pass a version (e.g. a hash of the answers and the status)
+# that must still match, which also catches changes made by other workers
+class PayloadCache:
+
+    def __init__(self, max_entries):
+        # (kind, score_id) -> (user_id, version, etag, body)
+        self.bodies = LRUCache(max_entries)
+
+    @staticmethod
+    def etag(body):
+        return hashlib.sha256(body).hexdigest()
+
+    # (etag, body) or None
+    def get(self, kind, score_id, user_id, version=None):
+        entry = self.bodies.get((kind, score_id), lambda entry: entry[0] == user_id and entry[1] == version)
+        if entry is None:
+            return None
+        return entry[2], entry[3]
+
+    # whether a body is cached for the assessment at all, without counting a lookup;
+    # lets the caller skip loading the questions
+    def has(self, kind, score_id):
+        return (kind, score_id) in self.bodies
+
+    def put(self, kind, score_id, user_id, body, version=None):
+        etag = self.etag(body)
+        self.bodies.put((kind, score_id), (user_id, version, etag, body))
+        return etag
+
+    # every kind of payload for these assessments
+    def invalidate(self, *score_ids):
+        score_ids = set(score_ids)
+        self.bodies.pop_where(lambda key: key[1] in score_ids)
+
+    def clear(self):
+        self.bodies.clear()
+
+    def stats(self):
+        stats = self.bodies.stats()
+        return {"hits": stats["hits"], "misses": stats["misses"], "hit_rate": stats["hit_rate"],
+                "entries": stats["entries"]}
+
+
+payload_cache = PayloadCache(Config.PAYLOAD_CACHE_SIZE)
@@ -0,0 +1,33 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+# a process pool started on first use and shared by every request thread of this process.
+# spawn so the workers never inherit locks held by request threads; the modules the tasks live
+# in are imported fresh in each worker, which is why scripts using a pool need a __main__ guard.
+# workers is read when the pool starts, so shutdown() then a new size takes effect on the next submit
+class ProcessPool:
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def submit(self, fn, *args):
+        return self.get().submit(fn, *args)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
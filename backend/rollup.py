@@ -0,0 +1,116 @@
+import click
+from sqlalchemy import select, update, delete, func, extract, case
+from sqlalchemy.exc import IntegrityError
+from models import db,Score,ScoreRollup,Difficulty,Status
+from availability import availability
+
+
+def _difficulty(difficulty):
+    return difficulty if isinstance(difficulty, Difficulty) else Difficulty(difficulty)
+
+
+# adds the deltas to one (user, year, month, subject, topic, difficulty) bucket
+# inside the caller's transaction; the caller commits
+def apply(user_id, time, subject, topic, difficulty, count=0, sum_score=0, scored_count=0, completed_count=0):
+    if not (count or sum_score or scored_count or completed_count):
+        return
+    bucket = (
+        ScoreRollup.user_id == user_id,
+        ScoreRollup.year == time.year,
+        ScoreRollup.month == time.month,
+        ScoreRollup.subject == subject,
+        ScoreRollup.topic == topic,
+        ScoreRollup.difficulty == _difficulty(difficulty),
+    )
+    # increments in SQL so concurrent requests never lose an update
+    increment = update(ScoreRollup).where(*bucket).values(
+        count=ScoreRollup.count + count,
+        sum_score=ScoreRollup.sum_score + sum_score,
+        scored_count=ScoreRollup.scored_count + scored_count,
+        completed_count=ScoreRollup.completed_count + completed_count,
+    ).execution_options(synchronize_session=False)
+    if db.session.execute(increment).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(ScoreRollup(
+                user_id=user_id, year=time.year, month=time.month, subject=subject, topic=topic,
+                difficulty=_difficulty(difficulty), count=count, sum_score=sum_score,
+                scored_count=scored_count, completed_count=completed_count,
+            ))
+    except IntegrityError:
+        # another request created the bucket first
+        db.session.execute(increment)
+
+
+def score_created(score):
+    apply(score.user_id, score.time, score.subject, score.topic, score.difficulty,
+          count=1,
+          sum_score=score.score or 0,
+          scored_count=0 if score.score is None else 1,
+          completed_count=1 if score.status == Status.completed else 0)
+
+
+# call after changing score.score / score.status with the values they had before
+def score_changed(score, old_score, old_status):
+    old_completed = old_status in (Status.completed, "completed")
+    new_completed = score.status in (Status.completed, "completed")
+    apply(score.user_id, score.time, score.subject, score.topic, score.difficulty,
+          sum_score=(score.score or 0) - (old_score or 0),
+          scored_count=(score.score is not None) - (old_score is not None),
+          completed_count=new_completed - old_completed)
+
+
+# rebuilds the rollup from the score table, for one user or everybody
+def backfill(user_id=None, chunk_size=1000):
+    year = extract("year", Score.time)
+    month = extract("month", Score.time)
+    query = (
+        select(
+            Score.user_id, year, month, Score.subject, Score.topic, Score.difficulty,
+            func.count(Score.id),
+            func.coalesce(func.sum(Score.score), 0),
+            func.count(Score.score),
+            func.sum(case((Score.status == Status.completed, 1), else_=0)),
+        )
+        .group_by(Score.user_id, year, month, Score.subject, Score.topic, Score.difficulty)
+    )
+    clear = delete(ScoreRollup)
+    if user_id is not None:
+        query = query.where(Score.user_id == user_id)
+        clear = clear.where(ScoreRollup.user_id == user_id)
+
+    db.session.execute(clear)
+    rows = 0
+    batch = []
+    for uid, y, m, subject, topic, difficulty, count, sum_score, scored, completed in db.session.execute(query).all():
+        batch.append({
+            "user_id": uid, "year": int(y), "month": int(m), "subject": subject, "topic": topic,
+            "difficulty": difficulty, "count": count, "sum_score": int(sum_score),
+            "scored_count": scored, "completed_count": int(completed or 0),
+        })
+        if len(batch) >= chunk_size:
+            db.session.execute(ScoreRollup.__table__.insert(), batch)
+            rows += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(ScoreRollup.__table__.insert(), batch)
+        rows += len(batch)
+    db.session.commit()
+    if user_id is None:
+        availability.clear()
+    else:
+        availability.invalidate(user_id)
+    return rows
+
+
+def average(sum_score, scored_count):
+    return round(sum_score / scored_count, 4) if scored_count else None
+
+
+def init_rollup(app):
+    @app.cli.command("backfill-rollup")
+    @click.option("--user-id", type=int, default=None)
+    def backfill_rollup(user_id):
+        rows = backfill(user_id)
+        click.echo(f"Wrote {rows} rollup rows")
@@ -1,33 +1,53 @@
-from flask import Blueprint, request, jsonify,send_file,Response,current_app
-from models import User,feedback,db,bcrypt,Question,Score,tz,Status
+from flask import Blueprint, request, jsonify,Response,current_app,stream_with_context
+from models import User,feedback,db,Question,Score,ScoreRollup,tz,local_now,Status
 from flask_jwt_extended import create_access_token
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import extract, func
+from sqlalchemy import func, update
 from flask_cors import CORS,cross_origin
-from flask_mail import Message
 from datetime import datetime,timedelta
 import random
 import json,re
-from extensions import mail 
 from config import Config
-from pypdf import PdfReader
-from reportlab.lib.enums import TA_LEFT, TA_RIGHT
-import google.generativeai as genai
-from reportlab.platypus import  SimpleDocTemplate,Paragraph,PageBreak,Spacer,Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet,ParagraphStyle
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from io import BytesIO
 import traceback
-from docx import Document
 from calendar import month_abbr,monthrange
+from syllabus_cache import syllabus_cache
+from extraction import extract_syllabus,EmptyDocument
+from assessments import generate_questions,save_assessment,create_assessment,GenerationError
+from assessments import load_assessment,load_questions,start_payload,preview_payload,stream_assessment,check_assessment,InvalidAssessment,answers_version,ANSWER_COLUMNS,QUESTION_COLUMNS
+from jobs import assessment_jobs,DONE,FAILED
+from sse import sse_event,SSE_HEADERS
+from gemini_clients import gemini,GeminiBusy
+import rollup
+from availability import availability
+from user_cache import user_cache
+from payload_cache import payload_cache
+from pagination import keyset_page,BadCursor
+from json_provider import negotiate,wants_msgpack,packb,MSGPACK_MIMETYPE
+import time
+from outbox import enqueue,outbox_stats,queue_depth
+from expiry import sweep_stats
+from passwords import password_hasher,HasherBusy
+from otp_store import otp_store,OTP_OK,OTP_LOCKED
+from werkzeug.wsgi import wrap_file
+from paper import Paper,shuffled_variants
+from paper_generation import generate_paper,generate_paper_chunked
+from paper_render import render_paper,render_variants_zip,paper_cache,EXPORTERS
+from instrumentation import instrument,stage,render_metrics
 
 
 
 routes = Blueprint("routes", __name__)
-CORS(routes)
+CORS(routes, expose_headers=["X-Paper-Id", "X-Extraction-Warning", "X-Generation-Warning", "ETag", "Content-Length", "Content-Range", "Accept-Ranges", "Content-Disposition", "X-Next-Cursor"])
+# per request timing, stage breakdown and query counts, served on /metrics
+instrument(routes, skip={"routes.metrics"})
 
-otp_storage = {}
+
+# password hashing pool is full: fail fast and tell the client when to retry
+def _hasher_busy(e):
+    response = jsonify({"success": False, "error": str(e)})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(Config.BCRYPT_RETRY_AFTER)
+    return response
 
 
 @routes.route("/Signup", methods=["POST"])
@@ -41,7 +61,10 @@ def Signup():
         return jsonify({"error": "Username already exists"}), 400
 
     new_user = User(username=username, email=email)
-    new_user.set_password(password)
+    try:
+        new_user.set_password(password)
+    except HasherBusy as e:
+        return _hasher_busy(e)
     db.session.add(new_user)
     db.session.commit()
 
@@ -53,7 +76,16 @@ def login():
     data = request.get_json()
     user = User.query.filter_by(email=data["email"]).first()
 
-    if user and user.check_password(data["password"]):
+    try:
+        valid = user is not None and user.check_password(data["password"])
+        if valid and password_hasher.needs_rehash(user.password_hash):
+            # BCRYPT_LOG_ROUNDS changed since this hash was made
+            user.set_password(data["password"])
+            db.session.commit()
+            user_cache.invalidate(user.id)
+    except HasherBusy as e:
+        return _hasher_busy(e)
+    if valid:
         token = create_access_token(identity={"user_id":user.id})
         return jsonify({"success": True, "message": "Login successful", "token": token})
 
@@ -65,18 +97,19 @@ def send_otp():
     data = request.json
     email = data.get("emailForReset")
     
-    user = User.query.filter_by(email=email).first()
+    user = user_cache.by_email(email)
     if not user:
         return jsonify({"message": "Email not registered!"}), 400
 
     otp = str(random.randint(100000, 999999))
-    otp_storage[email] = otp
-    msg = Message("Password Reset OTP", sender=current_app.config["MAIL_USERNAME"], recipients=[email])
-    msg.body = f"Your OTP for password reset is: {otp}"
-    
+    # queued in the outbox, the background sender delivers it
     try:
-        mail.send(msg)  
+        enqueue("Password Reset OTP", [email], f"Your OTP for password reset is: {otp}",
+                sender=current_app.config["MAIL_USERNAME"])
+        otp_store.put(email, otp)
+        db.session.commit()
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": "Failed to send email", "details": str(e)}), 500
 
     return jsonify({"message": "OTP sent successfully!"})
@@ -86,12 +119,12 @@ def verify_otp():
     data = request.json
     email = data.get("emailForReset")
     otp = data.get("otp")
-    print(otp)
-    print(otp_storage)
-    if email not in otp_storage or otp_storage[email] != otp:
+    result = otp_store.verify(email, otp)
+    if result == OTP_LOCKED:
+        return jsonify({"message": "Too many wrong attempts, request a new OTP"}), 429
+    if result != OTP_OK:
         return jsonify({"message": "Invalid OTP"}), 400
-   
-    del otp_storage[email]  
+
     return jsonify({"message": "OTP verified successfully"}), 200
 
 # reset and update the password
@@ -105,9 +138,12 @@ def reset_password():
         user = User.query.filter_by(email=email).first()
         """if not user:
             return jsonify({"message": "User not found!"}), 400"""
-        hashed_password = bcrypt.generate_password_hash(new_password).decode('utf-8')
-        user.password_hash= hashed_password
+        try:
+            user.set_password(new_password)
+        except HasherBusy as e:
+            return _hasher_busy(e)
         db.session.commit()
+        user_cache.invalidate(user.id)
     # update-password
     elif  data["actions"]=="update_password":
         id=data["user_id"]
@@ -115,12 +151,14 @@ def reset_password():
         new_password = details["newPassword"]
         user=User.query.filter_by(id=id).first()
         old_password=details["currentPassword"]
-        if not bcrypt.check_password_hash(user.password_hash,old_password):
-            return jsonify({"message":"password does not match"}),400
-    
-        hashed=bcrypt.generate_password_hash(new_password).decode('utf-8')
-        user.password_hash=hashed
+        try:
+            if not user.check_password(old_password):
+                return jsonify({"message":"password does not match"}),400
+            user.set_password(new_password)
+        except HasherBusy as e:
+            return _hasher_busy(e)
         db.session.commit()
+        user_cache.invalidate(user.id)
         
     else:
         return jsonify({"message":"something went wrong!!!"}),400
@@ -133,28 +171,32 @@ def reset_password():
 
 def pdf_file():
     try:
+        extraction_warnings = []
         # Accept either a file or syllabus text
         if "file" in request.files:
             userfile = request.files["file"]
             filename = userfile.filename.lower()
-            all_text = ""
-            if filename.endswith(".pdf"):
-                readerpdf = PdfReader(userfile)
-                if len(readerpdf.pages) == 0:
-                    return Response("The file is empty", status=400, mimetype="text/plain")
-                for i, page in enumerate(readerpdf.pages):
-                    page_text = page.extract_text()
-                    if page_text:
-                        all_text += f"Page {i+1}:\n{page_text}\n\n"
-            elif filename.endswith(".docx"):
-                readerdocx = Document(userfile)
-                if len(readerdocx.paragraphs) == 0:
-                    return Response("The file is empty", status=400, mimetype="text/plain")
-                for para in readerdocx.paragraphs:
-                    if para.text:
-                        all_text += para.text + "\n"
-            else:
+            if not filename.endswith((".pdf", ".docx")):
                 return Response("Unsupported file type", status=400, mimetype="text/plain")
+            file_data = userfile.read()
+            # same syllabus uploaded again -> reuse the extracted text
+            cache_key = syllabus_cache.key(file_data, filename)
+            all_text = syllabus_cache.get(cache_key)
+            if all_text is None:
+                try:
+                    with stage("extraction"):
+                        extracted = extract_syllabus(file_data, filename)
+                except EmptyDocument:
+                    return Response("The file is empty", status=400, mimetype="text/plain")
+                all_text = extracted.text
+                if not all_text and not extracted.complete:
+                    return Response("; ".join(extracted.warnings), status=504, mimetype="text/plain")
+                if extracted.complete:
+                    syllabus_cache.put(cache_key, all_text)
+                else:
+                    # partial text is still usable, but must not be cached as the full syllabus
+                    extraction_warnings = extracted.warnings
+                    current_app.logger.warning("Extraction warning: %s", "; ".join(extracted.warnings))
         elif "syllabus_text" in request.form:
             all_text = request.form["syllabus_text"]
             filename = "syllabus.txt"
@@ -163,100 +205,63 @@ def pdf_file():
 
         questionCount = request.form.get("questionCount", "5")
 
+        # export format, and how many shuffled variants of the one generated paper (zipped when > 1)
+        export_format = request.form.get("format", "pdf").lower()
+        if export_format not in EXPORTERS:
+            return Response(f"Unsupported format, use one of: {', '.join(EXPORTERS)}", status=400, mimetype="text/plain")
+        try:
+            variants = int(request.form.get("variants", 1))
+        except ValueError:
+            return Response("variants must be a number", status=400, mimetype="text/plain")
+        if not 1 <= variants <= Config.PAPER_MAX_VARIANTS:
+            return Response(f"variants must be between 1 and {Config.PAPER_MAX_VARIANTS}", status=400, mimetype="text/plain")
+
+        # long syllabi (or mode=chunked) are split and generated per part, concurrently
+        chunked = request.form.get("mode") == "chunked" or (
+            Config.PAPER_CHUNK_AUTO > 0 and len(all_text) > Config.PAPER_CHUNK_AUTO
+        )
+        if chunked:
+            try:
+                question_count = int(questionCount)
+            except ValueError:
+                return Response("questionCount must be a number", status=400, mimetype="text/plain")
+
         # Generate questions using AI
         api_key = Config.API_KEY
         if not api_key:
             return Response("Error: API key is missing", status=401, mimetype="text/plain")
+        generation_warnings = []
         try:
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel("gemini-2.0-flash")
-            model_response = model.generate_content(contents=(
-                f"""
-                Generate questions strictly based on the syllabus content provided .
-                 For each mark type (e.g., 2 mark, 5 mark), generate exactly {questionCount} questions.
-                Each question should be categorized by its corresponding mark allocation.
-                Ensure all questions are relevant to the syllabus and do not include any additional information.
-                Syllabus Content: {all_text}
-                ### Response Format:
-                Your response **must be** a valid JSON dictionary.
-                Do **not** include any explanations, extra text, or formatting outside of JSON.
-                Strictly follow those keys only:
-                include the title also
-                {{
-                    "Questions":[{{"title":"Ai robotics"}},
-                   {{ 
-                    "marks":"2 mark",
-                    "questions":[
-                        "1. what is robotics ?",
-                        "2. what are recent innovation?"
-                         // ... up to {questionCount} questions
-                    ]
-                    }},
-                    {{
-                    "marks":"2 mark",
-                    "questions":[
-                        "1. what is ai ?",
-                        "2. what is machine learning?"
-                         // ... up to {questionCount} questions
-                    ]
-                    }}
-                    ] 
-                }}
-                """
-            ))
-            response_text = model_response.candidates[0].content.parts[0].text
-            clean_response = re.sub(r"```json\n|\n```", "", response_text).strip()
-            try:
-                model_output = json.loads(clean_response)
-            except json.JSONDecodeError as e:
-                print("JSON Decode Error:", e)
-                return Response("AI did not return valid JSON", status=500, mimetype="text/plain")
-            if not model_output:
-                return Response("AI model did not generate any content", status=500, mimetype="text/plain")
+            if chunked:
+                model_output, generation_warnings = generate_paper_chunked(api_key, all_text, question_count)
+            else:
+                model_output = generate_paper(api_key, all_text, questionCount)
+        except GenerationError as e:
+            return Response(str(e), status=500, mimetype="text/plain")
+        except GeminiBusy as e:
+            return Response(str(e), status=503, mimetype="text/plain")
         except Exception as e:
             return Response(f"Google AI Error: {str(e)}", status=500, mimetype="text/plain")
 
         # Convert the text to PDF document
         try:
-            buffer = BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4)
-            styles = getSampleStyleSheet()
-            elements = []
-
-            # Title
-            title = model_output["Questions"][0].get("title", "No Title")
-            elements.append(Paragraph(f"<b>{title}</b>", styles["Title"]))
-            elements.append(Spacer(1, 10))
-            left_style = ParagraphStyle(name="LeftAlign", parent=styles["Heading2"], alignment=TA_LEFT)
-            right_style = ParagraphStyle(name="RightAlign", parent=styles["Heading2"], alignment=TA_RIGHT)
-
-            for item in model_output["Questions"][1:]:
-                marks = item.get("marks", "")
-                questions = item.get("questions", [])
-                data = [
-                    [
-                        Paragraph(f"<b>{marks} marks</b>", left_style),
-                        Paragraph(f"<b>{marks} x {len(questions)} = {len(questions) * int(marks.split()[0]) if marks and marks[0].isdigit() else ''}</b>", right_style)
-                    ]
-                ]
-                table = Table(data, colWidths=[200, 200])
-                table.setStyle(TableStyle([
-                    ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-                    ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
-                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                    ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-                ]))
-                elements.append(table)
-                elements.append(Spacer(1, 10))
-                for question in questions:
-                    elements.append(Paragraph(f"&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;{question}", styles["Normal"]))
-                    elements.append(Spacer(1, 13))
-                elements.append(Spacer(1, 12))
-
-            doc.build(elements)
-            buffer.seek(0)
-            return send_file(buffer, mimetype="application/pdf")
+            paper = Paper.from_model_output(model_output)
+            if variants > 1:
+                seed = request.form.get("seed", paper.key())
+                with stage("render"):
+                    archive, size = render_variants_zip(shuffled_variants(paper, variants, seed), export_format)
+                response = _stream_file(archive, size, "application/zip")
+                response.headers["Content-Disposition"] = f"attachment; filename=papers-{variants}.zip"
+            else:
+                with stage("render"):
+                    paper_id, document, size = render_paper(paper, export_format)
+                response = _paper_response(paper_id, export_format, document, size)
+                response.headers["X-Paper-Id"] = paper_id
+            if extraction_warnings:
+                response.headers["X-Extraction-Warning"] = "; ".join(extraction_warnings)
+            if generation_warnings:
+                response.headers["X-Generation-Warning"] = "; ".join(generation_warnings)
+            return response
         except Exception as e:
             print(f"PDF generation error: {e}")
             return Response(f"PDF generation error: {str(e)}", status=500, mimetype="text/plain")
@@ -264,6 +269,36 @@ def pdf_file():
     except Exception as e:
         print(f"Error: {e}")
         return Response(f"Error {str(e)}", status=500, mimetype="text/plain") 
+
+
+# streams a file in chunks with its length and Range support
+def _stream_file(f, size, mimetype, etag=None):
+    response = Response(
+        wrap_file(request.environ, f, Config.PAPER_CHUNK_SIZE),
+        mimetype=mimetype,
+        direct_passthrough=True,
+    )
+    response.content_length = size
+    if etag:
+        response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request.environ, accept_ranges=True, complete_length=size)
+
+
+# the paper key and format make the ETag
+def _paper_response(paper_id, export_format, document, size):
+    return _stream_file(document, size, EXPORTERS[export_format][1], f"{paper_id}.{export_format}")
+
+
+# download a paper rendered earlier again, without another gemini call or render.
+# If-None-Match / Range let clients revalidate or resume
+@routes.route("/papers/<paper_id>", methods=["GET"])
+def download_paper(paper_id):
+    export_format = request.args.get("format", "pdf").lower()
+    cached = paper_cache.open(paper_id, export_format)
+    if cached is None:
+        return Response("Paper not found, generate it again", status=404, mimetype="text/plain")
+    return _paper_response(paper_id, export_format, *cached)
     
 # feedback
 @routes.route("/feedback",methods=["POST"])
@@ -273,7 +308,7 @@ def feedBack():
     feedbacktype=data['feedbackType']
     feedback_message=data['feedbackText']
     current_time=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    user=User.query.filter_by(id=user_id).first()
+    user=user_cache.by_id(user_id)
     email_id=user.email
     username=user.username
 
@@ -283,22 +318,17 @@ def feedBack():
           f"feedback Type:{feedbacktype}\n\n"
           f"feedback from user:\n{feedback_message}"
           )
-    # sending email
-    msg=Message(subject=f"feedback from the {email_id}",
-                sender=current_app.config["MAIL_USERNAME"],
-                recipients=[current_app.config["MAIL_USERNAME"]],
-                body=body)
-    msg.reply_to=email_id
+    # the mail goes to the outbox in the same transaction as the feedback row
     try:
-        mail.send(msg)
+        enqueue(f"feedback from the {email_id}", [current_app.config["MAIL_USERNAME"]], body,
+                sender=current_app.config["MAIL_USERNAME"], reply_to=email_id)
+        new_feedback=feedback(username=username,email=email_id,feedback_message=feedback_message)
+        db.session.add(new_feedback)
+        db.session.commit()
     except Exception as e:
+        db.session.rollback()
         return jsonify({"message":f"{e} try back after some time"}),400
     
-    # inserting the values in feedback table
-    new_feedback=feedback(username=username,email=email_id,feedback_message=feedback_message)
-    db.session.add(new_feedback)
-    db.session.commit()
-    
     #reply to the user
     return jsonify({"message": "Feedback sent successfully!"}), 200
 
@@ -314,78 +344,106 @@ def generate_assessment():
     api_key=Config.API_KEY1
     if not api_key:
         return Response(f"Error : API key is missing",status=401,mimetype="text/plain")
-    
-    try:
-        genai.configure(api_key=api_key)
-        model=genai.GenerativeModel("gemini-2.0-flash")
-        model_res=model.generate_content(contents=(
-            f"""
-            generate multiple choice question based on {subject}
-            the topic related to the {topic} 
-            generate question based on the level {difficulty}
-            generate {num_of_quest} questions in given {subject}
-            ### Response Format:
-            Your response **must be** a valid JSON dictionary.
-            Do **not** include any explanations, extra text, or formatting outside of JSON.
-            Strictly follow those keys only:
-            {{{{
-                "question_text": "What is the capital of France?",
-                "topic": "Geography",
-                "choices": [
-                {{"id":"a","text": "Paris"}},
-                {{"id":"b","text": "Berlin"}},
-                {{"id":"c","text": "London"}},
-                {{"id":"d","text": "Madrid"}}
-                ],
-                "is_correct":"a" 
-            }},
-            {{
-                "question_text": "Who invented Python?",
-                "topic": "Programming",
-                "choices": [
-                {{"id":"a",text": "Guido van Rossum"}},
-                {{"id":"b",text": "James Gosling"}},
-                {{"id":"c","text": "Bjarne Stroustrup"}},
-                {{"id":"d","text": "Dennis Ritchie"}}
-                ],
-                "is_correct": "a"
-            }}}}
-            """
-        ))
-        response_text = model_res.candidates[0].content.parts[0].text
-        
-        clean_response = re.sub(r"```json\n|\n```", "", response_text).strip()
-        
-        model_output = None
-        try:
-            model_output = json.loads(clean_response)
-        except json.JSONDecodeError as e:
-            print("JSON Decode Error:", e)
 
-        
-        
-        if not model_output or not isinstance(model_output,list) :
-                return Response("AI model did not generate any valid list of content", status=500, mimetype="text/plain")
+    # job mode: hand the gemini call and the inserts to the worker pool and return at once
+    if data.get("mode")=="job":
+        job_id=assessment_jobs.submit(current_app._get_current_object(),"generate_assessment",create_assessment,
+                                      api_key,user_id,subject,topic,difficulty,num_of_quest)
+        return jsonify({"job_id":job_id,"status":"pending"}),202
+
+    # stream mode: each question goes out as a server-sent event while gemini is still writing
+    # the rest, a final "done" event carries the score id and the question ids
+    if data.get("mode")=="stream":
+        # bad values get a plain 400 before the stream starts
         try:
-            score=Score(subject=subject,topic=topic,difficulty=difficulty,user_id=user_id)
-            db.session.add(score)
-            db.session.flush() 
-            # Get the score ID after flushing
-            score_id = score.id
-            for i in model_output:
-                question=Question(score_id=score_id,quest_text=i["question_text"],choices=i["choices"],is_correct=i["is_correct"])
-                db.session.add(question)
-            db.session.commit()
-        except SQLAlchemyError as e:
-            db.session.rollback()
-            return Response(f"An error occurred: {str(e)}", status=500, mimetype="text/plain")   
-        
-        return jsonify({
-            "message": "Questions addded successfully!" 
-        }, 200)
+            check_assessment(subject,topic,difficulty,num_of_quest)
+        except InvalidAssessment as e:
+            return jsonify({"error": str(e)}), 400
+        def events():
+            try:
+                for event,payload in stream_assessment(api_key,user_id,subject,topic,difficulty,num_of_quest):
+                    yield sse_event(event,payload)
+            except GenerationError as e:
+                yield sse_event("error",{"message":str(e),"status":500})
+            except GeminiBusy as e:
+                yield sse_event("error",{"message":str(e),"status":503})
+            except Exception as e:
+                yield sse_event("error",{"message":f"Google AI Error: {str(e)}","status":500})
+
+        return Response(stream_with_context(events()),mimetype="text/event-stream",headers=SSE_HEADERS)
+
+    try:
+        model_output=generate_questions(api_key,subject,topic,difficulty,num_of_quest)
+    except GenerationError as e:
+        return Response(str(e), status=500, mimetype="text/plain")
+    except GeminiBusy as e:
+        return Response(str(e), status=503, mimetype="text/plain")
     except Exception as e:
-                return Response(f"Google AI Error: {str(e)}", status=500, mimetype="text/plain")
+        return Response(f"Google AI Error: {str(e)}", status=500, mimetype="text/plain")
+    try:
+        save_assessment(user_id,subject,topic,difficulty,model_output)
+    except SQLAlchemyError as e:
+        return Response(f"An error occurred: {str(e)}", status=500, mimetype="text/plain")
+    except Exception as e:
+        return Response(f"Google AI Error: {str(e)}", status=500, mimetype="text/plain")
+
+    return jsonify({
+        "message": "Questions addded successfully!" 
+    }, 200)
+
+# status of a queued assessment job
+@routes.route("/generate_assessment/jobs/<job_id>",methods=["GET"])
+def assessment_job_status(job_id):
+    job=assessment_jobs.store.get(job_id)
+    if job is None:
+        return jsonify({"error":"Job not found"}),404
+    return jsonify({"job_id":job_id,"status":job["status"],"score_id":job["score_id"],"error":job["error"]}),200
+
+# same status as server-sent events, one event per change until the job finishes
+@routes.route("/generate_assessment/jobs/<job_id>/events",methods=["GET"])
+def assessment_job_events(job_id):
+    if assessment_jobs.store.get(job_id) is None:
+        return jsonify({"error":"Job not found"}),404
+
+    def events():
+        last=None
+        while True:
+            job=assessment_jobs.store.get(job_id)
+            if job is None:
+                return
+            if job["status"]!=last:
+                last=job["status"]
+                yield sse_event("status",{"job_id":job_id,"status":last,"score_id":job["score_id"],"error":job["error"]})
+            if last in (DONE,FAILED):
+                return
+            time.sleep(Config.JOB_POLL_INTERVAL)
+
+    return Response(events(),mimetype="text/event-stream",headers=SSE_HEADERS)
     
+# payload cache kind for the body the client negotiated; msgpack bodies are cached next to the json ones
+def _payload_kind(kind):
+    return f"{kind}.msgpack" if wants_msgpack() else kind
+
+# serves a /start or /preview body from the payload cache with its ETag,
+# 304 when the client sent that ETag in If-None-Match
+def _assessment_payload(kind, score, version, build):
+    packed = kind.endswith(".msgpack")
+    mimetype = MSGPACK_MIMETYPE if packed else "application/json"
+    cached = payload_cache.get(kind, score.id, score.user_id, version)
+    if cached is None:
+        body = packb(build()) if packed else jsonify(build()).get_data()
+        etag = payload_cache.put(kind, score.id, score.user_id, body, version)
+    else:
+        etag, body = cached
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    response.vary.add("Accept")
+    return response
+
+
  # Starting the assessment   
 @routes.route("/start",methods=["POST"])
 def start():
@@ -393,43 +451,53 @@ def start():
     user_id=data.get("user_id")
     id=data.get("score_id")
 
-    #storing result
-    score=Score.query.filter_by(user_id=user_id,id=id).first()
+    # one round trip: the questions come along unless the body is already cached
+    kind=_payload_kind("start")
+    warm=payload_cache.has(kind,id)
+    score,questions=load_assessment(user_id,id,questions=not warm)
     if score is None:
         return jsonify({"error": "Assessment not found"}), 404
-    result={"id":id,"subject":score.subject,"title":score.topic,"questions":[]}
-    question=Question.query.filter_by(score_id=id)
-    for q in question:
-        options = []
-        for c in q.choices:
-            options.append({"id":c["id"],"option":c["text"]})
-        question_data = {
-            "id":q.id,
-            "text": q.quest_text,
-            "options": options
-        }
-        result["questions"].append(question_data)
-    score.status="completed"
-    db.session.commit()
-    print(result)
-    return jsonify(result)
+
+    def build():
+        return start_payload(score,questions if not warm else load_questions(score.id))
+
+    # the questions are fixed once generated and only go away when the assessment expires
+    response=_assessment_payload(kind,score,score.status==Status.expired,build)
+    if score.status!=Status.completed:
+        # only the request that actually flips the status counts it in the rollup
+        started=db.session.execute(update(Score).where(Score.id==score.id,Score.status!=Status.completed)
+                                   .values(status=Status.completed).execution_options(synchronize_session=False))
+        if started.rowcount:
+            rollup.apply(score.user_id,score.time,score.subject,score.topic,score.difficulty,completed_count=1)
+        db.session.commit()
+    return response
     
 #for pending requests
 @routes.route("/pending",methods=["POST"])
 def pending():
     data=request.json
     user_id=data["user_id"]
-    #status=data["status"]
-    user=User.query.filter_by(id=user_id).first()
-    res=Score.query.filter_by(user_id=user_id).all()
-    for r in res:
-        if r.due_date.tzinfo is None:
-            r.due_date=r.due_date.replace(tzinfo=tz)
-        if r.due_date<datetime.now(tz) and r.status==Status.pending:
-            Question.delete_expired(r)
-        
-    response={"user_name":user.username,"assessments":[{"id":r.id,"subject":r.subject,"topic":r.topic,"status":r.status.value,"created_at":r.time,"due_date":r.due_date, "score":r.score}  for r in res if r.due_date.replace(tzinfo=tz)>datetime.now(tz) ]}
-    return jsonify(response)
+    status=data.get("status")
+    user=user_cache.by_id(user_id)
+    # overdue assessments are expired by the background sweeper, this is a plain read
+    now=local_now()
+    query=db.session.query(Score.id,Score.subject,Score.topic,Score.status,Score.time,Score.due_date,Score.score).filter(
+        Score.user_id==user_id,Score.due_date>now)
+    if status:
+        if status not in Status.__members__:
+            return jsonify({"error": "Unknown status"}), 400
+        query=query.filter(Score.status==Status[status])
+    # without cursor or limit: the whole list, in the order it always came in.
+    # with either: newest first one page at a time, pass next_cursor back as cursor for the next page
+    if data.get("cursor") is None and data.get("limit") is None:
+        res,next_cursor=query.all(),None
+    else:
+        try:
+            res,next_cursor=keyset_page(query,Score.time,Score.id,data.get("cursor"),data.get("limit"))
+        except BadCursor as e:
+            return jsonify({"error": str(e)}), 400
+    response={"user_name":user.username,"assessments":[{"id":r.id,"subject":r.subject,"topic":r.topic,"status":r.status.value,"created_at":r.time,"due_date":r.due_date, "score":r.score}  for r in res],"next_cursor":next_cursor}
+    return negotiate(response)
 
 # deleting the account
 @routes.route("/delete",methods=["POST"])
@@ -441,6 +509,8 @@ def delete():
         if  user:
             db.session.delete(user)
             db.session.commit()
+            availability.invalidate(user.id)
+            user_cache.invalidate(user.id)
     except Exception as e:
         return jsonify({"message":"Something went wrong!!! Try again"}),400
     return jsonify(),200
@@ -455,23 +525,39 @@ def submitting():
     user_id=data["user_id"]
     score_id=data["score_id"]
     questions=data["answers"]
-    print(type(questions))
-    for qid_str , choice in questions.items():
-        qid=int(qid_str)
-        rec=Question.query.get(qid)
-        rec.user_choice=choice
-    sc_cal=Question.query.filter_by(score_id=score_id).all()
-    count=0
-    for i in sc_cal:
-        if(i.user_choice==i.is_correct):
-            count+=1
     score=Score.query.filter_by(user_id=user_id,id=score_id).first()
-    if(score):
-        score.score=count
+    if score is None:
+        return jsonify({"error": "Assessment not found"}), 404
+    try:
+        choices={int(qid_str):choice for qid_str,choice in questions.items()}
+    except ValueError:
+        return jsonify({"error": "Invalid question id"}), 400
+    # every answered question has to belong to this assessment
+    if choices:
+        owned=db.session.query(func.count(Question.id)).filter(
+            Question.score_id==score_id, Question.id.in_(list(choices))).scalar()
+        if owned!=len(choices):
+            return jsonify({"error": "Answers contain questions from another assessment"}), 400
+        # one executemany for all the choices
+        db.session.execute(update(Question),[{"id":qid,"user_choice":choice} for qid,choice in choices.items()])
+    # score counted by the database
+    count=db.session.query(func.count(Question.id)).filter(
+        Question.score_id==score_id, Question.user_choice==Question.is_correct).scalar()
+    old_score=score.score
+    score.score=count
+    rollup.score_changed(score,old_score,score.status)
     db.session.commit()
+    payload_cache.invalidate(score.id)
     return jsonify({"message":"choices added successfully","score":count})
 
 # code generator
+CODE_GENERATION_CONFIG = {
+    "temperature": 0.2,
+    "top_p": 1,
+    "top_k": 1,
+    "max_output_tokens": 2048,
+}
+
 @routes.route("/code_generator",methods=["POST"])
 def code_generator():
     data=request.json
@@ -479,16 +565,6 @@ def code_generator():
     language=data["language"]
     api_key=Config.API_KEY1
     try:
-        genai.configure(api_key=api_key)
-        # api model
-        model = genai.GenerativeModel(
-        model_name="gemini-2.0-flash",
-        generation_config={
-        "temperature": 0.2,
-        "top_p": 1,
-        "top_k": 1,
-        "max_output_tokens": 2048,
-        })
         code_prompt = f"""
                     Generate the code in {language} for the following task: {query}.
                      Include in-line comments in the code (explain key steps briefly).
@@ -502,12 +578,15 @@ def code_generator():
                      Here, it's the argument to the print() function. Python passes \\"hello\\" into the print() function to be displayed.""
                      }} 
                      Only return a valid JSON object. Do not include anything outside the JSON."""
-        code_response = model.generate_content(code_prompt)
+        code_response = gemini.generate(api_key, code_prompt, generation_config=CODE_GENERATION_CONFIG)
         #cleaning the request to suitable json format
         code = re.sub(r"```json\n|\n```", "",code_response.text).strip()
         #converting to dict
-        code_json=json.loads(code)
+        with stage("json_parse"):
+            code_json=json.loads(code)
         
+    except GeminiBusy as e:
+        return jsonify({"message":str(e)}),503
     except Exception as e:
         return jsonify({"message":"{e},something went wrong"}),400
     return jsonify({"code":code_json["code"],"explanation":code_json["explanation"]}),200
@@ -517,163 +596,171 @@ def code_generator():
 def recent_activity():
     try:
         data = request.json
-        user_id = data["user_id"]
-        threshold = datetime.now(tz) - timedelta(days=7)
-        #sort by time descending
-        user = (
-            Score.query
-            .filter(Score.user_id == user_id, Score.time >= threshold)
-            .order_by(Score.time.desc())
-            .all()
-        )
-        response = []
-        for u in user:
-            # due days for pending assessments
-            time = (u.due_date.date() - datetime.today().date()).days
-            delta = (datetime.now(tz) - u.time) if u.time.tzinfo else (datetime.now(tz) - u.time.replace(tzinfo=tz))
-            if delta.days < 1:
-                settime = f"{delta.total_seconds()/3600:.1f} hours ago"
-            else:
-                settime = f"{u.time.strftime('%Y-%m-%d')} at {u.time.strftime('%H:%M')}"
-            if u.status == Status.completed:
-                response.append({
-                    "id": u.id,
-                    "title": f"{u.subject} Assessment completed ",
-                    "time": settime,
-                    "status": u.status.value,
-                    "description": f" scored {round(((u.score/30)*100),2)}% on {u.topic}"
-                })
-            elif u.status == Status.pending:
-                response.append({
-                    "id": u.id,
-                    "title": f"{u.subject} Assessment assigned ",
-                    "time": settime,
-                    "status": u.status.value,
-                    "description": f"{u.topic} due in {time} days"
-                })
-            else:
-                response.append({
-                    "id": u.id,
-                    "title": f"{u.subject} Assessment expired",
-                    "time": settime,
-                    "status": u.status.value,
-                    "description": f"Assessment expired at {u.due_date.date().strftime('%Y-%m-%d')}"
-                })
-        return jsonify(response), 200
+        payload, next_cursor = _recent_activity_page(data["user_id"], data.get("cursor"), data.get("limit"))
+        # the body stays a plain list, the next page is announced in a header
+        response = negotiate(payload)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return response, 200
+    except BadCursor as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+# dashboard widget: the whole week
+def _recent_activity(user_id, **_):
+    payload, _next = _recent_activity_page(user_id)
+    return payload, 200
+
+def _recent_activity_page(user_id, cursor=None, limit=None):
+    threshold = datetime.now(tz) - timedelta(days=7)
+    #sort by time descending
+    query = (
+        db.session.query(Score.id, Score.subject, Score.topic, Score.status, Score.score, Score.time, Score.due_date)
+        .filter(Score.user_id == user_id, Score.time >= threshold)
+    )
+    # paged only when the client asks for it
+    if cursor is None and limit is None:
+        user, next_cursor = query.order_by(Score.time.desc()).all(), None
+    else:
+        user, next_cursor = keyset_page(query, Score.time, Score.id, cursor, limit)
+    response = []
+    for u in user:
+        # due days for pending assessments
+        time = (u.due_date.date() - datetime.today().date()).days
+        delta = (datetime.now(tz) - u.time) if u.time.tzinfo else (datetime.now(tz) - u.time.replace(tzinfo=tz))
+        if delta.days < 1:
+            settime = f"{delta.total_seconds()/3600:.1f} hours ago"
+        else:
+            settime = f"{u.time.strftime('%Y-%m-%d')} at {u.time.strftime('%H:%M')}"
+        if u.status == Status.completed:
+            response.append({
+                "id": u.id,
+                "title": f"{u.subject} Assessment completed ",
+                "time": settime,
+                "status": u.status.value,
+                "description": f" scored {round(((u.score/30)*100),2)}% on {u.topic}"
+            })
+        elif u.status == Status.pending:
+            response.append({
+                "id": u.id,
+                "title": f"{u.subject} Assessment assigned ",
+                "time": settime,
+                "status": u.status.value,
+                "description": f"{u.topic} due in {time} days"
+            })
+        else:
+            response.append({
+                "id": u.id,
+                "title": f"{u.subject} Assessment expired",
+                "time": settime,
+                "status": u.status.value,
+                "description": f"Assessment expired at {u.due_date.date().strftime('%Y-%m-%d')}"
+            })
+    return response, next_cursor
     
 # Total assessment
 @routes.route("/total_assessment", methods=["POST"])
 def total_assessment():
     try:
         data = request.json
-        user_id = data["user_id"]
-        this_month = datetime.now(tz).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        now = datetime.now(tz)
-
-        # Current month stats
-        current_stats = (
-            db.session.query(
-                func.count(Score.id),
-                func.avg(Score.score)
-            )
-            .filter(
-                Score.user_id == user_id,
-                Score.time >= this_month,
-                Score.time <= now
-            )
-            .first()
-        )
-        count = current_stats[0] or 0
-        average_score = int(current_stats[1]) if current_stats[1] is not None else 0
-
-        # Previous month stats
-        last_day_prev_month = this_month - timedelta(days=1)
-        first_day_prev_month = last_day_prev_month.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        prev_stats = (
-            db.session.query(
-                func.count(Score.id),
-                func.avg(Score.score)
-            )
-            .filter(
-                Score.user_id == user_id,
-                Score.time >= first_day_prev_month,
-                Score.time <= last_day_prev_month
-            )
-            .first()
-        )
-        previouscount = prev_stats[0] or 0
-        average_prev_month = int(prev_stats[1]) if prev_stats[1] is not None else 0
-
-        # Calculate percentages
-        days_in_current = (now - this_month).days + 1
-        days_in_prev = (last_day_prev_month - first_day_prev_month).days + 1
-
-        previous_percent = (previouscount / (days_in_prev * 3) * 100) if previouscount else 0
-        current_percent = (count / (days_in_current * 3) * 100) if count else 0
-        total_percent = current_percent - previous_percent
-        approximate_avg_score = average_score - average_prev_month
-        
-        return jsonify({
-            "total_assessment": count,
-            "percentage": f"{total_percent:.2f}%",
-            "average": average_score,
-            "approxi_average": approximate_avg_score
-        }), 200
-    
-
+        payload, status = _total_assessment(data["user_id"])
+        return jsonify(payload), status
     except Exception as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
+def _total_assessment(user_id, **_):
+    this_month = datetime.now(tz).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    now = datetime.now(tz)
+
+    # Current month stats
+    count, average = _month_totals(user_id, this_month.year, this_month.month)
+    average_score = int(average) if average is not None else 0
+
+    # Previous month stats
+    last_day_prev_month = this_month - timedelta(days=1)
+    first_day_prev_month = last_day_prev_month.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    previouscount, prev_average = _month_totals(user_id, first_day_prev_month.year, first_day_prev_month.month)
+    average_prev_month = int(prev_average) if prev_average is not None else 0
+
+    # Calculate percentages
+    days_in_current = (now - this_month).days + 1
+    days_in_prev = (last_day_prev_month - first_day_prev_month).days + 1
+
+    previous_percent = (previouscount / (days_in_prev * 3) * 100) if previouscount else 0
+    current_percent = (count / (days_in_current * 3) * 100) if count else 0
+    total_percent = current_percent - previous_percent
+    approximate_avg_score = average_score - average_prev_month
+
+    return {
+        "total_assessment": count,
+        "percentage": f"{total_percent:.2f}%",
+        "average": average_score,
+        "approxi_average": approximate_avg_score
+    }, 200
+
+# assessment count and average score of one month, from the rollup table
+def _month_totals(user_id, year, month):
+    count, sum_score, scored = db.session.query(
+        func.coalesce(func.sum(ScoreRollup.count), 0),
+        func.coalesce(func.sum(ScoreRollup.sum_score), 0),
+        func.coalesce(func.sum(ScoreRollup.scored_count), 0)
+    ).filter(
+        ScoreRollup.user_id == user_id,
+        ScoreRollup.year == year,
+        ScoreRollup.month == month
+    ).one()
+    return int(count), rollup.average(int(sum_score), int(scored))
+
+# years in which the user has assessments, from the cached availability index
+def _user_years(user_id):
+    return availability.years(user_id)
+
+# error payload when the user has nothing to analyse for the year, else None
+def _missing_year(years, year):
+    if not years:
+        return {"message":"No assessments found"},404
+    # nothing available in the specific year
+    if year not in years:
+        return {"message": "No assessments found for the specified year"}, 404
+    return None
+
 # analysis of the assessment
 @routes.route("/analysis",methods=["POST"])
 def analysis():
     try:
         data=request.json
-        user_id=data["user_id"]
-       
-        user=Score.query.filter_by(user_id=user_id).all()
-        if not user:
-            return jsonify({"message":"No assessments found"}),404
-    
-        year=data["selectedYear"]
-        year_start=datetime(year,1,1,0,0,0,0)
-        year_end=datetime(year,12,31,23,59,59,999999)
-        
-
-        # nothing available in the specific year
-        if not any(score.time >= year_start and score.time <= year_end for score in user):
-            return jsonify({"message": "No assessments found for the specified year"}), 404    
-        topic_scores=[]
-        # month wise subject average
-        
-        month=data["selectedMonth"]      
-        month_start=datetime(year,month,1)
-        last_day=monthrange(year,month)[1]   
-        month_end= datetime(year,month,last_day,23,59,59,999999) 
-        # topic wise scores
-        topic_stat=(
-            db.session.query(
-                Score.topic,
-                Score.time,
-                Score.score,
-                Score.difficulty
-            ).filter(
-                Score.user_id == user_id,
-                Score.time >= month_start,
-                Score.time <= month_end
-            ).order_by(
-                Score.topic, 
-            )
-        )
-        topic_scores = [{'topic': topic, 'date':time.strftime("%Y-%m-%d"),'score': score if score is not None else 0,"difficulty":difficulty.value} 
-                        for topic,time,score,difficulty in topic_stat]      
-        return jsonify(topic_scores), 200
-       
+        payload, status = _analysis(data["user_id"], data["selectedYear"], data["selectedMonth"])
+        return negotiate(payload), status
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500        
+
+def _analysis(user_id, year, month, years=None):
+    missing=_missing_year(_user_years(user_id) if years is None else years, year)
+    if missing:
+        return missing
+    month_start=datetime(year,month,1)
+    last_day=monthrange(year,month)[1]   
+    month_end= datetime(year,month,last_day,23,59,59,999999) 
+    # topic wise scores
+    topic_stat=(
+        db.session.query(
+            Score.topic,
+            Score.time,
+            Score.score,
+            Score.difficulty
+        ).filter(
+            Score.user_id == user_id,
+            Score.time >= month_start,
+            Score.time <= month_end
+        ).order_by(
+            Score.topic, 
+        )
+    )
+    topic_scores = [{'topic': topic, 'date':time.strftime("%Y-%m-%d"),'score': score if score is not None else 0,"difficulty":difficulty.value} 
+                    for topic,time,score,difficulty in topic_stat]      
+    return topic_scores, 200
     
     
 #subject wise analysis
@@ -681,94 +768,130 @@ def analysis():
 def sub_analysis():
     try:
         data=request.json
-        user_id=data["user_id"]
-       
-        user=Score.query.filter_by(user_id=user_id).all()
-        if not user:
-            return jsonify({"message":"No assessments found"}),404
-    
-        year=data["selectedYear"]
-        year_start=datetime(year,1,1,0,0,0,0)
-        year_end=datetime(year,12,31,23,59,59,999999)
-        
-
-        # nothing available in the specific year
-        if not any(score.time >= year_start and score.time <= year_end for score in user):
-            return jsonify({"message": "No assessments found for the specified year"}), 404    
-        subject_scores = []
-        # month wise subject average
-        
-        month=data["selectedMonth"]      
-        month_start=datetime(year,month,1)
-        last_day=monthrange(year,month)[1]   
-        month_end= datetime(year,month,last_day,23,59,59,999999) 
-        subject_stats=(
-            db.session.query(
-                Score.subject,
-                extract('month',Score.time).label('month'), 
-                func.avg(Score.score).label('average_score')
-            ).filter(
-                Score.user_id == user_id,
-                Score.time >= month_start,
-                Score.time <= month_end
-            ).group_by(
-                Score.subject, extract('month',Score.time)
-            
-            ).order_by(
-                Score.subject          
-            )
-        )
-        
-        subject_scores = [
-                {"month": month_abbr[month], "subject": subject, "average_score": average_score if average_score is not None else 0} 
-                  for subject, month, average_score in subject_stats]
-        return jsonify(subject_scores), 200
-           
+        payload, status = _sub_analysis(data["user_id"], data["selectedYear"], data["selectedMonth"])
+        return negotiate(payload), status
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+def _sub_analysis(user_id, year, month, years=None):
+    missing=_missing_year(_user_years(user_id) if years is None else years, year)
+    if missing:
+        return missing
+    # month wise subject average
+    subject_stats=(
+        db.session.query(
+            ScoreRollup.subject,
+            func.sum(ScoreRollup.sum_score),
+            func.sum(ScoreRollup.scored_count)
+        ).filter(
+            ScoreRollup.user_id == user_id,
+            ScoreRollup.year == year,
+            ScoreRollup.month == month
+        ).group_by(
+            ScoreRollup.subject
+        ).order_by(
+            ScoreRollup.subject          
+        )
+    )
+    subject_scores = []
+    for subject, sum_score, scored in subject_stats:
+        average_score = rollup.average(int(sum_score), int(scored))
+        subject_scores.append({"month": month_abbr[month], "subject": subject, "average_score": average_score if average_score is not None else 0})
+    return subject_scores, 200
     
 # for performance analysis
 @routes.route("/performance_analysis",methods=["POST"])
 def performance_analysis():
     try:
         data=request.json
-        user_id=data["user_id"]
-       
-        user=Score.query.filter_by(user_id=user_id).all()
-        if not user:
-            return jsonify({"message":"No assessments found"}),404
-    
-        year=data["selectedYear"]
-        year_start=datetime(year,1,1,0,0,0,0)
-        year_end=datetime(year,12,31,23,59,59,999999)
-        
-
-        # nothing available in the specific year
-        if not any(score.time >= year_start and score.time <= year_end for score in user):
-            return jsonify({"message": "No assessments found for the specified year"}), 404    
-        average_scores=[]
-        # month wise average scores
-        average_stats=(
-        db.session.query(
-            extract('month',Score.time).label('month'),
-            func.avg(Score.score).label('average_score'),
-            func.count(Score.id).label('total_assessments')
-        ) .filter(
-                Score.user_id == user_id,
-                Score.time >= year_start,
-                Score.time <= year_end
-        ).group_by('month').order_by('month').all()
-        )  
-         
-        average_scores= [
-            {"month": month_abbr[month], "average_score": average_score if average_score is not None else 0, "total_assessments": total_assessments}  
-            for month, average_score, total_assessments in average_stats] 
-        return jsonify(average_scores), 200
-       
+        payload, status = _performance_analysis(data["user_id"], data["selectedYear"])
+        return negotiate(payload), status
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+def _performance_analysis(user_id, year, month=None, years=None):
+    missing=_missing_year(_user_years(user_id) if years is None else years, year)
+    if missing:
+        return missing
+    # month wise average scores
+    average_stats=(
+    db.session.query(
+        ScoreRollup.month,
+        func.sum(ScoreRollup.sum_score),
+        func.sum(ScoreRollup.scored_count),
+        func.sum(ScoreRollup.count)
+    ) .filter(
+            ScoreRollup.user_id == user_id,
+            ScoreRollup.year == year
+    ).group_by(ScoreRollup.month).order_by(ScoreRollup.month).all()
+    )  
+    average_scores=[]
+    for month, sum_score, scored, total_assessments in average_stats:
+        average_score = rollup.average(int(sum_score), int(scored))
+        average_scores.append({"month": month_abbr[month], "average_score": average_score if average_score is not None else 0, "total_assessments": int(total_assessments)})
+    return average_scores, 200
+
+# year/month buckets that have assessments, for the analytics filters
+@routes.route("/availability",methods=["POST"])
+def available_periods():
+    data=request.json
+    user_id=data["user_id"]
+    buckets=sorted(availability.get(user_id))
+    months={}
+    for year, month in buckets:
+        months.setdefault(year, []).append(month)
+    return jsonify({
+        "years": sorted(months),
+        "months": {str(year): values for year, values in months.items()},
+        "first_year": buckets[0][0] if buckets else None
+    }),200
+
+# every analytics widget in one request
+DASHBOARD_WIDGETS = {
+    "recent_activity": _recent_activity,
+    "total_assessment": _total_assessment,
+    "performance_analysis": _performance_analysis,
+    "sub_analysis": _sub_analysis,
+    "analysis": _analysis,
+}
+# widgets that need selectedYear (and selectedMonth)
+YEAR_WIDGETS = {"performance_analysis", "sub_analysis", "analysis"}
+
+@routes.route("/dashboard",methods=["POST"])
+def dashboard():
+    data=request.json
+    user_id=data["user_id"]
+    widgets=data.get("widgets") or list(DASHBOARD_WIDGETS)
+    unknown=[w for w in widgets if w not in DASHBOARD_WIDGETS]
+    if unknown:
+        return jsonify({"error": f"Unknown widgets: {', '.join(unknown)}"}), 400
+    year=data.get("selectedYear")
+    month=data.get("selectedMonth")
+    if YEAR_WIDGETS.intersection(widgets) and (year is None or month is None):
+        return jsonify({"error": "selectedYear and selectedMonth are required"}), 400
+
+    # one existence probe shared by all the widgets
+    years=_user_years(user_id) if YEAR_WIDGETS.intersection(widgets) else None
+    response={}
+    errors={}
+    for name in widgets:
+        try:
+            if name in YEAR_WIDGETS:
+                payload, status = DASHBOARD_WIDGETS[name](user_id, year, month, years=years)
+            else:
+                payload, status = DASHBOARD_WIDGETS[name](user_id)
+        except Exception as e:
+            traceback.print_exc()
+            db.session.rollback()
+            payload, status = {"error": f"An error occurred: {str(e)}"}, 500
+        if status == 200:
+            response[name]=payload
+        else:
+            errors[name]=dict(payload, status=status)
+    response["errors"]=errors
+    return negotiate(response), 200
     
 # Preview of the assessment
 @routes.route("/preview",methods=["POST"])
@@ -777,26 +900,17 @@ def preview():
     user_id=data.get("user_id")
     id=data.get("score_id")
 
-    #storing result
-    score=Score.query.filter_by(user_id=user_id,id=id).first()
+    kind=_payload_kind("preview")
+    warm=payload_cache.has(kind,id)
+    # with a cached body only the answers are read, to check it is still current
+    score,questions=load_assessment(user_id,id,columns=ANSWER_COLUMNS if warm else QUESTION_COLUMNS)
     if score is None:
         return jsonify({"error": "Assessment not found"}), 404
-    result={"id":id,"subject":score.subject,"title":score.topic,"questions":[]}
-    question=Question.query.filter_by(score_id=id)
-    for q in question:
-        options = []
-        for c in q.choices:
-            options.append({"id":c["id"],"option":c["text"]})
-        question_data = {
-            "id":q.id,
-            "text": q.quest_text,
-            "options": options,
-            "correct_option":q.is_correct,
-            "user_choice":q.user_choice
-        }
-        result["questions"].append(question_data)
-    
-    return jsonify(result)
+
+    def build():
+        return preview_payload(score,questions if not warm else load_questions(score.id))
+
+    return _assessment_payload(kind,score,(answers_version(questions),score.status.value),build)
 
  # Update the status of the score
 @routes.route("/update_exam_status", methods=["POST"])
@@ -820,18 +934,28 @@ def update_exam_status():
 def profile():
     data=request.json
     user_id=data.get("user_id")
-    user=User.query.filter_by(id=user_id).first()
+    user=user_cache.by_id(user_id)
+    if user is None:
+        return jsonify({"error":"User not found"}),404
     return jsonify({"user":{"email":user.email,"name":user.username}}),200
 
 
-
-
-
-
-
-
-
-
-
-
-
+# prometheus scrape endpoint: request/stage/query/gemini histograms and every cache and worker's stats
+@routes.route("/metrics",methods=["GET"])
+def metrics():
+    components={
+        "syllabus_cache":syllabus_cache.stats(),
+        "paper_cache":paper_cache.stats(),
+        "availability_cache":availability.stats(),
+        "user_cache":user_cache.stats(),
+        "payload_cache":payload_cache.stats(),
+        "expiry_sweep":sweep_stats.snapshot(),
+        "mail_outbox":outbox_stats.snapshot(),
+        "password_hasher":password_hasher.stats(),
+        "gemini":gemini.stats(),
+    }
+    try:
+        components["mail_outbox_queue"]=queue_depth()
+    except SQLAlchemyError:
+        db.session.rollback()
+    return Response(render_metrics(components),mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,13 @@
+import json
+
+
+# one server-sent event frame
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # stop nginx from buffering the stream
+    "X-Accel-Buffering": "no",
+}
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import threading
+from config import Config
+from disk_cache import DiskCache
+from lru_cache import LRUCache
+
+
+# content-addressed cache for extracted syllabus text
+# memory tier: LRU bounded by total characters
+# disk tier: one file per hash, least recently used evicted once the directory grows past its limit
+class SyllabusCache:
+
+    def __init__(self, directory, memory_limit, disk_limit):
+        self.directory = directory
+        self.memory = LRUCache(memory_limit, sizeof=len)
+        self.disk = DiskCache(directory, disk_limit) if directory else None
+        self._lock = threading.Lock()
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(data, filename):
+        # the extension decides which reader is used, so it is part of the key
+        digest = hashlib.sha256()
+        digest.update(os.path.splitext(filename)[1].lower().encode())
+        digest.update(b"\0")
+        digest.update(data)
+        return digest.hexdigest()
+
+    def get(self, key):
+        text = self.memory.get(key)
+        if text is not None:
+            return text
+        text = self._read_disk(key)
+        with self._lock:
+            if text is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self.memory.put(key, text)
+        return text
+
+    def put(self, key, text):
+        self.memory.put(key, text)
+        self._write_disk(key, text)
+
+    def stats(self):
+        memory = self.memory.stats()
+        with self._lock:
+            disk_hits, misses = self.disk_hits, self.misses
+        lookups = memory["hits"] + disk_hits + misses
+        return {
+            "memory_hits": memory["hits"],
+            "disk_hits": disk_hits,
+            "misses": misses,
+            "hit_rate": (memory["hits"] + disk_hits) / lookups if lookups else 0.0,
+            "evictions": memory["evictions"] + (self.disk.evictions if self.disk else 0),
+            "memory_entries": memory["entries"],
+            "memory_size": memory["size"],
+        }
+
+    def _read_disk(self, key):
+        if self.disk is None:
+            return None
+        f = self.disk.open(key + ".txt")
+        if f is None:
+            return None
+        with f:
+            try:
+                return f.read().decode("utf-8")
+            except (OSError, UnicodeDecodeError):
+                return None
+
+    def _write_disk(self, key, text):
+        if self.disk is None:
+            return
+        try:
+            self.disk.write(key + ".txt", lambda out: out.write(text.encode("utf-8")))
+        except OSError as e:
+            print(f"Syllabus cache write failed: {e}")
+
+
+syllabus_cache = SyllabusCache(
+    Config.SYLLABUS_CACHE_DIR,
+    Config.SYLLABUS_CACHE_MEMORY_LIMIT,
+    Config.SYLLABUS_CACHE_DISK_LIMIT,
+)
@@ -0,0 +1,24 @@
+# the real app on a throwaway SQLite database, with no background threads
+import os
+import sys
+
+# has to be set before config.py is imported
+os.environ.setdefault("DATABASE_URI", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "test-secret-key-test-secret-key-test")
+os.environ.setdefault("EXPIRY_SWEEP_INTERVAL", "0")
+os.environ.setdefault("MAIL_OUTBOX_INTERVAL", "0")
+os.environ.setdefault("SLOW_REQUEST_MS", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from app import app as flask_app
+from models import db
+
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield flask_app
+        db.session.remove()
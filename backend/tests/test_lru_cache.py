@@ -0,0 +1,53 @@
+import time
+from lru_cache import LRUCache
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_bounded_by_size():
+    cache = LRUCache(10, sizeof=len)
+    cache.put("a", "x" * 6)
+    cache.put("b", "x" * 6)
+    assert "a" not in cache and "b" in cache
+    # bigger than the whole limit: not kept, and does not push anything out
+    cache.put("c", "x" * 11)
+    assert "c" not in cache and "b" in cache
+    assert cache.stats()["size"] == 6
+
+
+def test_ttl():
+    cache = LRUCache(10, ttl=0.1)
+    cache.put("a", 1)
+    cache.put("b", 2, ttl=10)
+    time.sleep(0.15)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+
+def test_valid_and_stats():
+    cache = LRUCache(10)
+    cache.put("a", (1, "v1"))
+    assert cache.get("a", lambda entry: entry[1] == "v2") is None
+    assert cache.get("a", lambda entry: entry[1] == "v1") == (1, "v1")
+    assert "a" in cache
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_pop_where():
+    cache = LRUCache(10)
+    for kind in ("start", "preview"):
+        for score_id in (1, 2):
+            cache.put((kind, score_id), b"body")
+    cache.pop_where(lambda key: key[1] == 1)
+    assert len(cache) == 2 and ("start", 2) in cache
+    assert cache.stats()["size"] == 2
@@ -0,0 +1,68 @@
+# every OTP store: consumed on success, locked after max_attempts wrong guesses (even for the
+# right code), replaced by a newer put, gone after the ttl
+import time
+import pytest
+from models import db
+from otp_store import MemoryOTPStore,SQLOTPStore,RedisOTPStore,OTP_OK,OTP_INVALID,OTP_LOCKED
+
+TTL = 1
+MAX_ATTEMPTS = 3
+
+
+# (store, put); put is store.put except where the caller has to commit
+@pytest.fixture(params=["memory", "redis", "sql"])
+def otp(request):
+    if request.param == "memory":
+        store = MemoryOTPStore(TTL, MAX_ATTEMPTS)
+        return store, store.put
+    if request.param == "redis":
+        fakeredis = pytest.importorskip("fakeredis")
+        store = RedisOTPStore(TTL, MAX_ATTEMPTS, fakeredis.FakeRedis(decode_responses=True))
+        return store, store.put
+    request.getfixturevalue("app")
+    store = SQLOTPStore(TTL, MAX_ATTEMPTS)
+
+    # put() leaves the commit to the caller, the way /send-otp uses it
+    def put(email, code):
+        store.put(email, code)
+        db.session.commit()
+
+    return store, put
+
+
+def test_consumed_on_success(otp):
+    store, put = otp
+    put("ok@example.com", "111111")
+    assert store.verify("ok@example.com", "000000") == OTP_INVALID
+    assert store.verify("ok@example.com", "111111") == OTP_OK
+    assert store.verify("ok@example.com", "111111") == OTP_INVALID
+
+
+def test_locked_after_max_attempts(otp):
+    store, put = otp
+    put("lock@example.com", "222222")
+    for _ in range(MAX_ATTEMPTS):
+        assert store.verify("lock@example.com", "000000") == OTP_INVALID
+    assert store.verify("lock@example.com", "222222") == OTP_LOCKED
+    put("lock@example.com", "333333")
+    assert store.verify("lock@example.com", "333333") == OTP_OK
+
+
+def test_replaced_by_newer_put(otp):
+    store, put = otp
+    put("replaced@example.com", "444444")
+    put("replaced@example.com", "555555")
+    assert store.verify("replaced@example.com", "444444") == OTP_INVALID
+    assert store.verify("replaced@example.com", "555555") == OTP_OK
+
+
+def test_expires_after_ttl(otp):
+    store, put = otp
+    put("ttl@example.com", "666666")
+    time.sleep(TTL + 0.2)
+    assert store.verify("ttl@example.com", "666666") == OTP_INVALID
+
+
+def test_unknown_email(otp):
+    store, _ = otp
+    assert store.verify("nobody@example.com", "111111") == OTP_INVALID
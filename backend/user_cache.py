@@ -0,0 +1,67 @@
+from collections import namedtuple
+from models import db,User
+from config import Config
+from lru_cache import LRUCache
+
+
+# what the handlers actually read off a user
+UserRecord = namedtuple("UserRecord", "id username email")
+
+
+# read-through cache of user records by id, plus an email -> id index for the login lookup.
+# a username or email change invalidates the record here, but only in this worker; the ttl
+# is how long the others can keep serving the old one.
+# unknown users are not cached, so a new signup is visible straight away
+class UserCache:
+
+    def __init__(self, max_users, ttl):
+        self.records = LRUCache(max_users, ttl)
+        self.emails = LRUCache(max_users, ttl)
+
+    def _load(self, *criterion):
+        row = db.session.query(User.id, User.username, User.email).filter(*criterion).first()
+        if row is None:
+            return None
+        record = UserRecord(row.id, row.username, row.email)
+        self.records.put(record.id, record)
+        self.emails.put(record.email, record.id)
+        return record
+
+    def by_id(self, user_id):
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        return self.records.get(user_id) or self._load(User.id == user_id)
+
+    def by_email(self, email):
+        if not email:
+            return None
+        user_id = self.emails.get(email)
+        # the index can outlive a change of email, so the record has to agree
+        record = self.records.get(user_id, lambda record: record.email == email) if user_id is not None else None
+        return record or self._load(User.email == email)
+
+    def invalidate(self, *user_ids):
+        for user_id in user_ids:
+            record = self.records.pop(user_id)
+            if record is not None:
+                self.emails.pop(record.email)
+
+    def clear(self):
+        self.records.clear()
+        self.emails.clear()
+
+    def stats(self):
+        records = self.records.stats()
+        # a lookup by email that misses the index never reaches the records
+        hits, misses = records["hits"], records["misses"] + self.emails.misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "users": records["entries"],
+        }
+
+
+user_cache = UserCache(Config.USER_CACHE_SIZE, Config.USER_CACHE_TTL)